@@ -0,0 +1,156 @@
+import argparse
+import json
+import pathlib
+import tempfile
+import time
+import tracemalloc
+import typing
+
+import numpy
+import pandas
+import pyarrow
+from pipeline_core.parquet import read_parquet, write_parquet
+from pipeline_core.regression import compute_moments
+from pipeline_core.regression import fit_linear_model as fit_moments
+from pipeline_core.statistics import compute_statistics, read_dropped, read_imputed
+
+from generate import generate_dataframe
+
+THRESHOLD = 0.2
+
+
+# The helpers as they were copied into every pipeline before `pipeline_core`.
+def drop_columns_with_missing_values(data: pandas.DataFrame, threshold: float) -> pandas.DataFrame:
+    column_mask = (data.isna().sum(axis="index") / data.shape[0]) > threshold
+    data = data.drop(columns=data.columns[column_mask])
+    if data.shape[1] == 0:
+        raise ValueError("No columns left after dropping")
+    return data
+
+
+def impute_columns_with_mean(data: pandas.DataFrame) -> pandas.DataFrame:
+    data = data.fillna(data.mean(numeric_only=True))
+    return data
+
+
+def fit_linear_model(data: pandas.DataFrame) -> numpy.ndarray:
+    import sklearn.linear_model
+
+    X = data.drop(columns=data.columns[0])
+    y = data.drop(columns=data.columns[1:])
+    model = sklearn.linear_model.LinearRegression()
+    model.fit(X, y)
+    return model.coef_.ravel()
+
+
+def profile(function: typing.Callable[[], object], repeats: int) -> tuple[float, int]:
+    # Best time of `repeats` and the peak memory of one more run: the peak of the Python and
+    # NumPy allocations (traced by `tracemalloc`) plus the peak of the Arrow memory pool, an upper
+    # bound when the two do not peak at once.
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    default_pool = pyarrow.default_memory_pool()
+    pool = pyarrow.proxy_memory_pool(default_pool)  # own statistics, reset for every run
+    pyarrow.set_memory_pool(pool)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1] + pool.max_memory()
+    finally:
+        tracemalloc.stop()
+        pyarrow.set_memory_pool(default_pool)
+    return (min(times), peak)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the cleaning and fitting of pipeline_core with the pandas copies."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", type=int, default=20, help="number of feature columns")
+    parser.add_argument("--missing", type=float, default=0.5)
+    parser.add_argument("--sparse", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=pathlib.Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(0)
+    data = generate_dataframe(
+        rng,
+        rows=args.rows,
+        columns=args.columns,
+        missing=args.missing,
+        sparse=rng.random(args.columns) < args.sparse,
+        drift=0.0,
+        coefficients=rng.uniform(low=-2.0, high=2.0, size=args.columns),
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Every helper starts from the concatenated Parquet file, like the clean and fit stages.
+        path = pathlib.Path(directory) / "concat.parquet"
+        write_parquet(pyarrow.Table.from_pandas(data, preserve_index=False), path)
+        data_bytes = path.stat().st_size
+        del data
+        statistics = compute_statistics(path)
+        helpers = {
+            "null_scan": (
+                lambda: read_parquet(path).isna().sum(),
+                lambda: compute_statistics(path),
+            ),
+            "drop": (
+                lambda: drop_columns_with_missing_values(read_parquet(path), THRESHOLD),
+                lambda: read_dropped(path, statistics, THRESHOLD),
+            ),
+            "impute": (
+                lambda: impute_columns_with_mean(read_parquet(path)),
+                lambda: read_imputed(path, statistics),
+            ),
+            "fit": (
+                lambda: fit_linear_model(impute_columns_with_mean(read_parquet(path))),
+                lambda: fit_moments(compute_moments(path), "impute"),
+            ),
+        }
+        results: dict[str, dict[str, dict[str, float]]] = {}
+        for helper, implementations in helpers.items():
+            results[helper] = {}
+            for name, function in zip(["pandas", "core"], implementations):
+                seconds, peak = profile(function, args.repeats)
+                results[helper][name] = {"time": seconds, "peak_memory": peak}
+
+        # pipeline_core gives the same data and model as the pandas copies.
+        frame = read_parquet(path)
+        dropped = drop_columns_with_missing_values(frame, THRESHOLD)
+        assert read_dropped(path, statistics, THRESHOLD).equals(dropped)
+        imputed = impute_columns_with_mean(frame)
+        assert numpy.allclose(read_imputed(path, statistics), imputed)
+        expected = fit_linear_model(imputed)
+        coefficients = fit_moments(compute_moments(path), "impute").coefficients
+        difference = float(numpy.max(numpy.abs(coefficients - expected)))
+
+    print(f"{args.rows} rows, {args.columns + 1} columns, {data_bytes / 2**20:.1f} MB on disk")
+    print(f"{'helper':<11}{'pandas [ms]':>13}{'core [ms]':>11}{'pandas [MB]':>13}{'core [MB]':>11}")
+    for helper, result in results.items():
+        pandas_result, core_result = result["pandas"], result["core"]
+        print(
+            f"{helper:<11}"
+            f"{pandas_result['time'] * 1000:>13.1f}{core_result['time'] * 1000:>11.1f}"
+            f"{pandas_result['peak_memory'] / 2**20:>13.1f}"
+            f"{core_result['peak_memory'] / 2**20:>11.1f}"
+        )
+    print(f"Largest coefficient difference from sklearn: {difference:.2e}")
+    if args.output:
+        output = {
+            "rows": args.rows,
+            "columns": args.columns + 1,
+            "data_bytes": data_bytes,
+            "helpers": results,
+            "coefficient_difference": difference,
+        }
+        args.output.write_text(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import json
+import pathlib
+import tempfile
+
+import numpy
+import pandas
+from pipeline_core.excel import available_engines, read_excel
+
+from generate import generate_dataframe
+from parquet_profiles import measure
+
+
+def parse_shape(value: str) -> tuple[int, int]:
+    rows, columns = value.lower().split("x")
+    return (int(rows), int(columns))
+
+
+def benchmark_engines(
+    path: pathlib.Path,
+    engines: list[str],
+    repeats: int,
+) -> dict[str, dict[str, float | bool]]:
+    # Every engine must read the same data as `pandas.read_excel`, the current behavior.
+    expected = pandas.read_excel(path)
+    results: dict[str, dict[str, float | bool]] = {}
+    for engine in engines:
+        table = read_excel(path, engine=engine)
+        results[engine] = {
+            "read_time": measure(lambda: read_excel(path, engine=engine), repeats),
+            "matches": table.to_pandas().equals(expected),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the Excel reader engines.")
+    parser.add_argument(
+        "--shapes",
+        type=parse_shape,
+        nargs="+",
+        default=[(2, 3), (1000, 10), (10000, 20)],
+        help="workbook shapes as ROWSxCOLUMNS (feature columns)",
+    )
+    parser.add_argument("--missing", type=float, default=0.5)
+    parser.add_argument("--sparse", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=pathlib.Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    engines = available_engines()
+    rng = numpy.random.default_rng(0)
+    results: dict[str, dict[str, dict[str, float | bool]]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for rows, columns in args.shapes:
+            data = generate_dataframe(
+                rng,
+                rows=rows,
+                columns=columns,
+                missing=args.missing,
+                sparse=numpy.arange(columns) < round(args.sparse * columns),
+                drift=0.0,
+                coefficients=rng.uniform(low=-2.0, high=2.0, size=columns),
+            )
+            path = pathlib.Path(directory) / f"{rows}x{columns}.xlsx"
+            data.to_excel(path, index=False)
+            results[path.stem] = benchmark_engines(path, engines, args.repeats)
+
+    print(f"{'shape':<12}{'engine':<10}{'read [s]':>10}{'speedup':>9}{'matches':>9}")
+    for shape, shape_results in results.items():
+        baseline = shape_results["pandas"]["read_time"]
+        for engine, result in shape_results.items():
+            print(
+                f"{shape:<12}{engine:<10}{result['read_time']:>10.3f}"
+                f"{baseline / result['read_time']:>8.1f}x{str(result['matches']):>9}"
+            )
+    # The engine `auto` picks, the fastest installed one.
+    print(f"Engine used by default: {engines[0]} (EXCEL_ENGINE=auto)")
+    if args.output:
+        args.output.write_text(json.dumps({"engines": engines, "shapes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
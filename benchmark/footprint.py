@@ -0,0 +1,103 @@
+import argparse
+import json
+import pathlib
+import tempfile
+
+import numpy
+import pandas
+import pyarrow
+from pipeline_core.footprint import Footprint, format_report, optimize_table
+from pipeline_core.parquet import read_parquet, write_parquet
+from pipeline_core.regression import compute_moments, fit_linear_model
+from pipeline_core.statistics import compute_statistics, read_dropped, read_imputed
+
+from generate import generate_dataframe
+
+METHODS = ["drop", "impute"]
+
+
+def frame_bytes(data: pandas.DataFrame) -> int:
+    return int(data.memory_usage(deep=True).sum())
+
+
+def run_stages(path: pathlib.Path) -> tuple[dict[str, int], dict[str, numpy.ndarray]]:
+    # Memory of the data every stage holds, and the models fitted to the concatenated file.
+    memory = {"concat": frame_bytes(read_parquet(path))}
+    statistics = compute_statistics(path)
+    memory["clean_drop"] = frame_bytes(read_dropped(path, statistics, threshold=0.2))
+    memory["clean_impute"] = frame_bytes(read_imputed(path, statistics))
+    moments = compute_moments(path)
+    coefficients = {
+        method: fit_linear_model(moments, method, threshold=0.2).to_model().coefficients
+        for method in METHODS
+    }
+    return memory, coefficients
+
+
+def relative_change(before: numpy.ndarray, after: numpy.ndarray) -> float:
+    return float(numpy.max(numpy.abs(after - before) / numpy.maximum(numpy.abs(before), 1e-12)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the concat footprint optimization.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", type=int, default=10, help="number of feature columns")
+    parser.add_argument("--missing", type=float, default=0.5)
+    parser.add_argument("--sparse", type=float, default=0.2)
+    parser.add_argument("--categories", type=int, default=8, help="values of a text column")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="float32 relative error")
+    parser.add_argument(
+        "--coefficient-tolerance", type=float, default=1e-4, help="relative change allowed"
+    )
+    parser.add_argument("--output", type=pathlib.Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(0)
+    data = generate_dataframe(
+        rng,
+        rows=args.rows,
+        columns=args.columns,
+        missing=args.missing,
+        sparse=numpy.arange(args.columns) < round(args.sparse * args.columns),
+        drift=0.0,
+        coefficients=rng.uniform(low=-2.0, high=2.0, size=args.columns),
+    )
+    # Low-cardinality text and small integers, like a site name and a counter.
+    data["site"] = rng.choice([f"site_{i}" for i in range(args.categories)], size=args.rows)
+    data["count"] = rng.integers(0, 100, size=args.rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        default_path = pathlib.Path(directory) / "default.parquet"
+        optimized_path = pathlib.Path(directory) / "optimized.parquet"
+        write_parquet(pyarrow.Table.from_pandas(data), default_path)
+        table, report = optimize_table(data, Footprint(tolerance=args.tolerance))
+        write_parquet(table, optimized_path)
+        del table
+        default_memory, default_coefficients = run_stages(default_path)
+        optimized_memory, optimized_coefficients = run_stages(optimized_path)
+
+    print(format_report(report))
+    print(f"{'stage':<14}{'default [MB]':>13}{'optimized [MB]':>15}{'share':>7}")
+    for stage, before in default_memory.items():
+        after = optimized_memory[stage]
+        print(f"{stage:<14}{before / 2**20:>13.1f}{after / 2**20:>15.1f}{after / before:>7.0%}")
+    changes = {
+        method: relative_change(default_coefficients[method], optimized_coefficients[method])
+        for method in METHODS
+    }
+    within = all(change <= args.coefficient_tolerance for change in changes.values())
+    for method, change in changes.items():
+        print(f"Largest relative change of the {method} coefficients: {change:.2e}")
+    print(f"Coefficients within {args.coefficient_tolerance:g}: {within}")
+    if args.output:
+        results = {
+            "report": report,
+            "memory": {"default": default_memory, "optimized": optimized_memory},
+            "coefficient_changes": changes,
+            "within_tolerance": within,
+        }
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
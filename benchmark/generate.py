@@ -0,0 +1,93 @@
+import argparse
+import datetime
+import pathlib
+
+import numpy
+import pandas
+
+ROOT = pathlib.Path(__file__).parent
+
+
+def generate_dataframe(
+    rng: numpy.random.Generator,
+    rows: int,
+    columns: int,
+    missing: float,
+    sparse: numpy.ndarray,
+    drift: float,
+    coefficients: numpy.ndarray,
+) -> pandas.DataFrame:
+    # The first column is the regression target, the same as `weight` in the sample data.
+    X = rng.normal(loc=10.0, scale=3.0, size=(rows, columns))
+    y = X @ coefficients + rng.normal(scale=1.0, size=rows)
+    # Missing values only go to the sparse columns, the `drop` cleaning method
+    # keeps the other columns and the model can not be fitted with any NaN left.
+    X[(rng.random(size=X.shape) < missing) & sparse] = numpy.nan
+    data = pandas.DataFrame(X, columns=[f"x{i}" for i in range(columns)])
+    data.insert(0, "y", y)
+    # Like `color` in the sample data, some files are missing some of the features.
+    dropped = [name for name in data.columns[1:] if rng.random() < drift]
+    return data.drop(columns=dropped)
+
+
+def generate(
+    output_dir: pathlib.Path,
+    files: int,
+    rows: int,
+    columns: int,
+    missing: float,
+    sparse: float = 0.2,
+    drift: float = 0.0,
+    seed: int = 0,
+    start: datetime.date = datetime.date(2025, 1, 1),
+    file_format: str = "xlsx",
+) -> list[pathlib.Path]:
+    rng = numpy.random.default_rng(seed)
+    coefficients = rng.uniform(low=-2.0, high=2.0, size=columns)
+    sparse_columns = numpy.arange(columns) < round(sparse * columns)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths: list[pathlib.Path] = []
+    for i in range(files):
+        date = start + datetime.timedelta(days=i)
+        data = generate_dataframe(rng, rows, columns, missing, sparse_columns, drift, coefficients)
+        path = output_dir / f"{date.isoformat()}.{file_format}"
+        if file_format == "xlsx":
+            data.to_excel(path, index=False)
+        elif file_format == "parquet":
+            data.to_parquet(path, index=False)
+        else:
+            raise NotImplementedError(f"Unknown file format: '{file_format}'")
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic raw data files.")
+    parser.add_argument("--output", type=pathlib.Path, default=ROOT / ".work" / "raw")
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=10, help="number of feature columns")
+    parser.add_argument(
+        "--missing", type=float, default=0.5, help="missing value rate in the sparse columns"
+    )
+    parser.add_argument("--sparse", type=float, default=0.2, help="share of sparse columns")
+    parser.add_argument("--drift", type=float, default=0.0, help="column drop rate per file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["xlsx", "parquet"], default="xlsx")
+    args = parser.parse_args()
+    paths = generate(
+        output_dir=args.output,
+        files=args.files,
+        rows=args.rows,
+        columns=args.columns,
+        missing=args.missing,
+        sparse=args.sparse,
+        drift=args.drift,
+        seed=args.seed,
+        file_format=args.format,
+    )
+    print(f"Generated {len(paths)} files in '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
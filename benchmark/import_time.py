@@ -0,0 +1,86 @@
+import argparse
+import ast
+import json
+import math
+import pathlib
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = pathlib.Path(__file__).parent.parent / "snakemake" / "scripts"
+# What Snakemake's preamble runs in every script job before the script itself.
+PREAMBLE = "import snakemake.script"
+
+
+def script_imports(path: pathlib.Path) -> str:
+    # Top-level imports of a script, its body is not run.
+    tree = ast.parse(path.read_text())
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in imports)
+
+
+def measure(python: str, code: str, repeats: int) -> float:
+    # Best of `repeats` fresh interpreters, the other runs are slowed down by unrelated work.
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([python, "-c", code], check=True, cwd=SCRIPTS_DIR)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_scripts(python: str, repeats: int) -> dict[str, dict[str, float]]:
+    interpreter = measure(python, "pass", repeats)
+    preamble = measure(python, PREAMBLE, repeats)
+    results = {}
+    for path in sorted(SCRIPTS_DIR.glob("*.py")):
+        if path.name.startswith("_"):
+            continue
+        code = f"import sys\nsys.path.insert(0, '.')\n{PREAMBLE}\n{script_imports(path)}"
+        startup = measure(python, code, repeats)
+        results[path.stem] = {
+            "interpreter_time": interpreter,
+            "preamble_time": preamble - interpreter,
+            "import_time": startup - preamble,
+            "startup_time": startup,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the startup cost of Snakemake jobs.")
+    parser.add_argument("--python", default=sys.executable, help="interpreter of the pipeline")
+    parser.add_argument("--dates", type=int, default=300, help="dates to convert")
+    parser.add_argument("--batch-size", type=int, default=16, help="dates converted per job")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=pathlib.Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = benchmark_scripts(args.python, args.repeats)
+    print(
+        f"{'script':<20}{'python [s]':>11}{'preamble [s]':>13}{'imports [s]':>12}{'total [s]':>10}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<20}{result['interpreter_time']:>11.3f}{result['preamble_time']:>13.3f}"
+            f"{result['import_time']:>12.3f}{result['startup_time']:>10.3f}"
+        )
+
+    # Startup paid by the conversion of all dates, once per job.
+    startup = results["convert_data"]["startup_time"]
+    jobs = math.ceil(args.dates / args.batch_size)
+    conversion = {
+        "per_date": args.dates * startup,
+        "batched": jobs * startup,
+    }
+    print(
+        f"Startup of converting {args.dates} dates: {conversion['per_date']:.1f} s with a job "
+        f"per date, {conversion['batched']:.1f} s with {jobs} jobs of {args.batch_size} dates "
+        f"(convert.batch_size: {args.batch_size})"
+    )
+    if args.output:
+        args.output.write_text(json.dumps({"scripts": results, "conversion": conversion}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
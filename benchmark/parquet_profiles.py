@@ -0,0 +1,92 @@
+import argparse
+import json
+import pathlib
+import tempfile
+import time
+import typing
+
+import numpy
+import pandas
+from pipeline_core.parquet import PROFILES, read_parquet, write_parquet
+
+from generate import generate_dataframe
+
+
+def measure(function: typing.Callable[[], object], repeats: int) -> float:
+    # Best of `repeats`, the other runs are slowed down by unrelated work.
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_profiles(
+    data: pandas.DataFrame,
+    directory: pathlib.Path,
+    repeats: int,
+) -> dict[str, dict[str, float]]:
+    projection = list(data.columns[:2])
+    results: dict[str, dict[str, float]] = {}
+    for name in PROFILES:
+        path = directory / f"{name}.parquet"
+        results[name] = {
+            "write_time": measure(lambda: write_parquet(data, path, profile=name), repeats),
+            "size": path.stat().st_size,
+            "read_time": measure(lambda: read_parquet(path), repeats),
+            "read_time_no_mmap": measure(lambda: read_parquet(path, memory_map=False), repeats),
+            "projected_read_time": measure(lambda: read_parquet(path, projection), repeats),
+        }
+    return results
+
+
+def best_profile(results: dict[str, dict[str, float]], reads: int) -> str:
+    # An intermediate file is written once and read by `reads` stages.
+    return min(
+        results, key=lambda name: results[name]["write_time"] + reads * results[name]["read_time"]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the Parquet write profiles.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", type=int, default=10, help="number of feature columns")
+    parser.add_argument("--missing", type=float, default=0.5)
+    parser.add_argument("--sparse", type=float, default=0.2)
+    parser.add_argument("--reads", type=int, default=2, help="reads of every written file")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=pathlib.Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(0)
+    data = generate_dataframe(
+        rng,
+        rows=args.rows,
+        columns=args.columns,
+        missing=args.missing,
+        sparse=numpy.arange(args.columns) < round(args.sparse * args.columns),
+        drift=0.0,
+        coefficients=rng.uniform(low=-2.0, high=2.0, size=args.columns),
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        results = benchmark_profiles(data, pathlib.Path(directory), args.repeats)
+    best = best_profile(results, args.reads)
+
+    print(
+        f"{'profile':<10}{'write [s]':>10}{'read [s]':>10}{'no mmap [s]':>12}"
+        f"{'projected [s]':>14}{'size [MB]':>11}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<10}{result['write_time']:>10.3f}{result['read_time']:>10.3f}"
+            f"{result['read_time_no_mmap']:>12.3f}{result['projected_read_time']:>14.3f}"
+            f"{result['size'] / 2**20:>11.1f}"
+        )
+    print(f"Best profile for {args.reads} reads per write: {best} (PARQUET_PROFILE={best})")
+    if args.output:
+        args.output.write_text(json.dumps({"best": best, "profiles": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
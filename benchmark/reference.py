@@ -0,0 +1,88 @@
+import argparse
+import json
+import pathlib
+import sys
+import time
+
+# Framework-free implementation of the sample pipeline. Its timings are the data processing
+# that every framework has to do, the rest of a framework's wall time is its overhead.
+start = time.perf_counter()
+
+import pandas  # noqa: E402
+from pipeline_core.excel import read_excel  # noqa: E402
+from pipeline_core.model import predict_parquet  # noqa: E402
+from pipeline_core.parquet import read_parquet, write_parquet  # noqa: E402
+from pipeline_core.regression import (  # noqa: E402
+    compute_moments,
+    fit_linear_model,
+    merge_moments,
+)
+from pipeline_core.statistics import (  # noqa: E402
+    compute_statistics,
+    read_dropped,
+    read_imputed,
+)
+
+IMPORT_TIME = time.perf_counter() - start
+
+
+def run(root: pathlib.Path) -> dict[str, float]:
+    stages: dict[str, float] = {"import": IMPORT_TIME}
+
+    start = time.perf_counter()
+    parquet_paths = []
+    for path in sorted((root / "data" / "raw").glob("*.xlsx")):
+        output_path = root / "data" / "interim" / f"{path.stem}.parquet"
+        write_parquet(read_excel(path), output_path)
+        parquet_paths.append(output_path)
+    stages["convert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dataframes = [read_parquet(path) for path in parquet_paths]
+    concat_path = root / "data" / "interim" / "concat.parquet"
+    write_parquet(pandas.concat(dataframes).reset_index(drop=True), concat_path)
+    del dataframes
+    stages["concat"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    statistics = compute_statistics(concat_path)
+    stages["column_statistics"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    moments = merge_moments(compute_moments(path) for path in parquet_paths)
+    stages["moments"] = time.perf_counter() - start
+
+    for method in ["drop", "impute"]:
+        start = time.perf_counter()
+        if method == "drop":
+            clean = read_dropped(concat_path, statistics, threshold=0.2)
+        else:
+            clean = read_imputed(concat_path, statistics)
+        write_parquet(clean, root / "data" / "processed" / f"clean_{method}.parquet")
+        del clean
+        stages[f"clean_{method}"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model = fit_linear_model(moments, method, threshold=0.2).to_model()
+        model_path = root / "models" / f"linear_regression_{method}.npz"
+        model.save(model_path)
+        stages[f"linear_regression_{method}"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        predict_parquet(
+            model, concat_path, root / "data" / "processed" / f"prediction_{method}.parquet"
+        )
+        stages[f"predict_{method}"] = time.perf_counter() - start
+
+    return stages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the pipeline without any framework.")
+    parser.add_argument("root", type=pathlib.Path)
+    args = parser.parse_args()
+    json.dump(run(args.root), sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+import pathlib
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+from generate import generate
+
+ROOT = pathlib.Path(__file__).parent.resolve()
+REPO = ROOT.parent
+WORK_DIR = ROOT / ".work"
+RESULTS_DIR = ROOT / "results"
+
+LUIGI_COMMAND = """
+import sys
+import luigi
+from tasks import AllData
+sys.exit(0 if luigi.build([AllData()], local_scheduler=True, workers={workers}) else 1)
+"""
+
+DAGSTER_COMMAND = """
+import dagster
+from assets import clean_data, clean_partition, column_statistics, concat_data, definitions
+from assets import linear_regression, moments, prediction
+instance = dagster.DagsterInstance.get()
+selection = [concat_data, column_statistics, moments]
+resources = definitions.resources
+dagster.materialize(definitions.assets, selection=selection, instance=instance, resources=resources)
+for key in clean_partition.get_partition_keys():
+    dagster.materialize(
+        definitions.assets,
+        selection=[clean_data, linear_regression, prediction],
+        partition_key=key,
+        instance=instance,
+        resources=resources,
+    )
+"""
+
+# Output files of each stage, used to tell when a stage finished inside a framework run.
+STAGE_OUTPUTS = {
+    "convert": "data/interim/????-??-??.parquet",
+    "concat": "data/interim/concat.*",  # Parquet, or Arrow IPC in Dagster
+    "clean_drop": "data/processed/clean_drop.parquet",
+    "clean_impute": "data/processed/clean_impute.parquet",
+    "linear_regression_drop": "models/*_drop.npz",
+    "linear_regression_impute": "models/*_impute.npz",
+    "predict_drop": "data/processed/prediction_drop.parquet",
+    "predict_impute": "data/processed/prediction_impute.parquet",
+}
+OUTPUT_DIRS = ["data/interim", "data/processed", "models"]
+
+
+@dataclasses.dataclass
+class Framework:
+    name: str
+    command: list[str]
+    cache_dirs: list[str] = dataclasses.field(default_factory=list)
+    env: dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+def frameworks(workers: int) -> dict[str, Framework]:
+    return {
+        framework.name: framework
+        for framework in [
+            Framework("reference", ["reference.py", "."]),
+            Framework(
+                "snakemake",
+                ["-m", "snakemake", "--cores", str(workers)],
+                cache_dirs=[".snakemake"],
+            ),
+            Framework("kedro", ["-m", "kedro", "run"]),
+            Framework(
+                "luigi",
+                ["-c", LUIGI_COMMAND.format(workers=workers)],
+                env={"PYTHONPATH": "."},
+            ),
+            Framework(
+                "prefect",
+                ["flow.py"],
+                cache_dirs=[".prefect/storage"],
+                env={"PREFECT_HOME": ".prefect"},
+            ),
+            Framework(
+                "dagster",
+                ["-c", DAGSTER_COMMAND],
+                cache_dirs=[".dagster/storage", ".dagster/history", ".dagster/schedules"],
+                env={"DAGSTER_HOME": ".dagster"},
+            ),
+        ]
+    }
+
+
+def find_python(name: str) -> str:
+    for candidate in [".venv/Scripts/python.exe", ".venv/bin/python"]:
+        path = REPO / name / candidate
+        if path.exists():
+            return str(path)
+    return sys.executable
+
+
+class Sampler(threading.Thread):
+    # Polls the whole process tree, short-lived jobs (e.g. Snakemake scripts) are
+    # seen as long as they live longer than the polling interval.
+
+    def __init__(self, pid: int, interval: float = 0.02) -> None:
+        super().__init__(daemon=True)
+        self.root = psutil.Process(pid)
+        self.interval = interval
+        self.peak_rss = 0
+        self.io: dict[int, tuple[int, int]] = {}
+        self.cpu: dict[int, float] = {}
+        self.stopped = threading.Event()
+
+    def sample(self) -> None:
+        try:
+            processes = [self.root] + self.root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
+        rss = 0
+        for process in processes:
+            try:
+                with process.oneshot():
+                    rss += process.memory_info().rss
+                    times = process.cpu_times()
+                    self.cpu[process.pid] = times.user + times.system
+                    if hasattr(process, "io_counters"):
+                        io = process.io_counters()
+                        # `*_chars` (Linux) count page cache hits too, `*_bytes` only disk I/O.
+                        self.io[process.pid] = (
+                            getattr(io, "read_chars", io.read_bytes),
+                            getattr(io, "write_chars", io.write_bytes),
+                        )
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+    def result(self) -> dict[str, float]:
+        return {
+            "cpu_time": sum(self.cpu.values()),
+            "peak_rss": self.peak_rss,
+            "bytes_read": sum(read for read, _ in self.io.values()),
+            "bytes_written": sum(written for _, written in self.io.values()),
+        }
+
+
+def prepare_workspace(name: str, raw_dir: pathlib.Path) -> pathlib.Path:
+    source = ROOT if name == "reference" else REPO / name
+    workspace = WORK_DIR / name
+    if workspace.exists():
+        shutil.rmtree(workspace)
+    ignore = shutil.ignore_patterns(
+        ".venv", ".work", "results", "*.xlsx", "*.parquet", "*.pkl", "*.npz"
+    )
+    shutil.copytree(source, workspace, ignore=ignore)
+    for directory in ["data/raw", *OUTPUT_DIRS]:
+        (workspace / directory).mkdir(parents=True, exist_ok=True)
+    for path in raw_dir.glob("*.xlsx"):
+        try:
+            os.link(path, workspace / "data" / "raw" / path.name)
+        except OSError:
+            shutil.copy2(path, workspace / "data" / "raw" / path.name)
+    return workspace
+
+
+def clear_outputs(workspace: pathlib.Path, framework: Framework) -> None:
+    for directory in OUTPUT_DIRS:
+        for path in (workspace / directory).iterdir():
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.name != ".gitkeep":
+                path.unlink()
+    for directory in framework.cache_dirs:
+        shutil.rmtree(workspace / directory, ignore_errors=True)
+
+
+def stage_finished(workspace: pathlib.Path, started: float) -> dict[str, float]:
+    finished: dict[str, float] = {}
+    for stage, pattern in STAGE_OUTPUTS.items():
+        mtimes = [path.stat().st_mtime for path in workspace.glob(pattern)]
+        if mtimes and max(mtimes) >= started:
+            finished[stage] = max(mtimes) - started
+    return finished
+
+
+def run_once(
+    framework: Framework, python: str, workspace: pathlib.Path, phase: str
+) -> dict[str, object]:
+    if phase == "cold":
+        clear_outputs(workspace, framework)
+    env = os.environ | {
+        key: str((workspace / value).resolve()) if value.startswith(".") else value
+        for key, value in framework.env.items()
+    }
+    started = time.time()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [python, *framework.command],
+        cwd=workspace,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+    )
+    sampler = Sampler(process.pid)
+    sampler.start()
+    stdout, stderr = process.communicate()
+    wall_time = time.perf_counter() - start
+    sampler.stop()
+    record: dict[str, object] = {
+        "framework": framework.name,
+        "phase": phase,
+        "returncode": process.returncode,
+        "wall_time": wall_time,
+        **sampler.result(),
+        "stage_finished": stage_finished(workspace, started),
+    }
+    if framework.name == "reference" and process.returncode == 0:
+        record["stage_time"] = json.loads(stdout)
+    if process.returncode != 0:
+        record["error"] = stderr[-2000:]
+    return record
+
+
+def summarize(runs: list[dict]) -> None:
+    reference = {run["phase"]: run for run in runs if run["framework"] == "reference"}
+    print(f"{'framework':<10} {'phase':<5} {'wall [s]':>9} {'overhead [s]':>13} {'RSS [MB]':>9}")
+    for run in runs:
+        # Only a cold run does the same data processing as the reference pipeline.
+        run["overhead_time"] = None
+        if run["phase"] == "cold" and "cold" in reference:
+            run["overhead_time"] = run["wall_time"] - reference["cold"]["wall_time"]
+        overhead = "-" if run["overhead_time"] is None else f"{run['overhead_time']:.2f}"
+        print(
+            f"{run['framework']:<10} {run['phase']:<5} {run['wall_time']:>9.2f}"
+            f" {overhead:>13} {run['peak_rss'] / 2**20:>9.1f}"
+            + ("" if run["returncode"] == 0 else "  FAILED")
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the pipelines on synthetic data.")
+    parser.add_argument("--frameworks", nargs="+", default=list(frameworks(1)))
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--missing", type=float, default=0.5)
+    parser.add_argument("--sparse", type=float, default=0.2)
+    parser.add_argument("--drift", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--python",
+        nargs="*",
+        default=[],
+        metavar="FRAMEWORK=PATH",
+        help="interpreter per framework, defaults to '<framework>/.venv' or the current one",
+    )
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    parameters = {
+        key: getattr(args, key)
+        for key in ["files", "rows", "columns", "missing", "sparse", "drift", "seed", "workers"]
+    }
+    raw_dir = WORK_DIR / "raw-{files}x{rows}x{columns}-{missing}-{sparse}-{drift}-{seed}".format(
+        **parameters
+    )
+    if not raw_dir.exists():
+        generate(
+            raw_dir.with_suffix(".tmp"),
+            files=args.files,
+            rows=args.rows,
+            columns=args.columns,
+            missing=args.missing,
+            sparse=args.sparse,
+            drift=args.drift,
+            seed=args.seed,
+        )
+        raw_dir.with_suffix(".tmp").rename(raw_dir)
+
+    pythons = dict(item.split("=", 1) for item in args.python)
+    available = frameworks(args.workers)
+    names = ["reference"] + [name for name in args.frameworks if name != "reference"]
+    runs: list[dict] = []
+    for name in names:
+        framework = available[name]
+        python = pythons.get(name, find_python(name))
+        workspace = prepare_workspace(name, raw_dir)
+        for repeat in range(args.repeats):
+            for phase in ["cold", "warm"]:
+                print(f"Running {name} ({phase}, {repeat + 1}/{args.repeats})", flush=True)
+                record = run_once(framework, python, workspace, phase)
+                runs.append(record | {"repeat": repeat, "python": python})
+
+    summarize(runs)
+    output = args.output or RESULTS_DIR / f"{datetime.datetime.now():%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    host = {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "memory": psutil.virtual_memory().total,
+    }
+    output.write_text(json.dumps({"parameters": parameters, "host": host, "runs": runs}, indent=2))
+    print(f"Results written to '{output}'")
+
+
+if __name__ == "__main__":
+    main()
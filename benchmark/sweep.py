@@ -0,0 +1,110 @@
+import argparse
+import json
+import pathlib
+import tempfile
+import time
+
+import numpy
+import pyarrow
+from pipeline_core.parquet import write_parquet
+from pipeline_core.regression import compute_moments, solve
+from pipeline_core.statistics import Statistics, compute_statistics
+from pipeline_core.sweep import Candidate, evaluate, fit_candidate, read_candidate, sweep_candidates
+
+from generate import generate_dataframe
+from parquet_profiles import measure
+
+
+def run_chain(
+    path: pathlib.Path,
+    directory: pathlib.Path,
+    statistics: Statistics,
+    candidate: Candidate,
+) -> float:
+    # What a hard-coded variant costs: clean, write, read and fit.
+    clean_path = directory / f"clean_{candidate.name}.parquet"
+    start = time.perf_counter()
+    write_parquet(read_candidate(path, statistics, candidate), clean_path)
+    moments = compute_moments(clean_path)
+    solve(moments, list(candidate.columns), candidate.impute)
+    elapsed = time.perf_counter() - start
+    clean_path.unlink()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the cleaning sweep with fitting one by one."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", type=int, default=20, help="number of feature columns")
+    parser.add_argument(
+        "--max-missing", type=float, default=0.6, help="missing rate of the sparsest column"
+    )
+    parser.add_argument("--thresholds", type=int, default=21, help="thresholds from 0 to 1")
+    parser.add_argument("--subsets", type=int, default=10, help="random feature subsets")
+    parser.add_argument("--chain", type=int, default=3, help="candidates run through the chain")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=pathlib.Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(0)
+    data = generate_dataframe(
+        rng,
+        rows=args.rows,
+        columns=args.columns,
+        missing=0.0,
+        sparse=numpy.zeros(args.columns, dtype=bool),
+        drift=0.0,
+        coefficients=rng.uniform(low=-2.0, high=2.0, size=args.columns),
+    )
+    # Every feature has its own missing rate, so every threshold keeps different columns.
+    features = list(data.columns[1:])
+    for name, rate in zip(features, numpy.linspace(0.0, args.max_missing, args.columns)):
+        data.loc[rng.random(args.rows) < rate, name] = numpy.nan
+    feature_sets = {
+        f"subset{i}": list(rng.choice(features, size=args.columns // 2, replace=False))
+        for i in range(args.subsets)
+    }
+    thresholds = numpy.linspace(0.0, 1.0, args.thresholds).tolist()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / "concat.parquet"
+        write_parquet(pyarrow.Table.from_pandas(data, preserve_index=False), path)
+        del data
+        moments = compute_moments(path)
+        statistics = compute_statistics(path)
+        candidates = sweep_candidates(moments, thresholds, feature_sets=feature_sets)
+        sweep_time = measure(lambda: evaluate(moments, candidates), args.repeats)
+        loop_time = measure(
+            lambda: [fit_candidate(moments, candidate) for candidate in candidates], args.repeats
+        )
+        chain_times = [
+            run_chain(path, pathlib.Path(directory), statistics, candidate)
+            for candidate in candidates[: args.chain]
+        ]
+
+    # Scores of the batched pass against the fits of `fit_linear_model`.
+    _, r2_adj = evaluate(moments, candidates)
+    fitted = numpy.array([fit_candidate(moments, candidate).r2_adj for candidate in candidates])
+    difference = float(numpy.max(numpy.abs(r2_adj - fitted)))
+    chain_time = float(numpy.mean(chain_times)) * len(candidates)  # extrapolated
+    times = {"sweep": sweep_time, "loop": loop_time, "chain": chain_time}
+
+    print(f"{len(candidates)} candidates from {args.thresholds} thresholds, {args.subsets} subsets")
+    print(f"{'method':<8}{'total [s]':>11}{'per candidate [ms]':>20}{'speedup':>9}")
+    for method, elapsed in times.items():
+        per_candidate = elapsed / len(candidates) * 1000
+        print(f"{method:<8}{elapsed:>11.3f}{per_candidate:>20.3f}{chain_time / elapsed:>8.0f}x")
+    print(f"Largest adjusted R2 difference from the one by one fits: {difference:.2e}")
+    if args.output:
+        results = {
+            "candidates": len(candidates),
+            "times": times,
+            "r2_adj_difference": difference,
+        }
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import pathlib
+import tempfile
+import typing
+
+import pandas
+import pyarrow
+import pyarrow.ipc
+
+from .parquet import read_parquet
+
+# Directory of intermediate Arrow files, tmpfs where available: processes memory-mapping the
+# same file share its pages, the data is neither copied, deserialized nor written to disk.
+SHARED_DIR = pathlib.Path(
+    os.environ.get(
+        "ARROW_SHARED_DIR",
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    )
+)
+
+# Data read by the cleaning, statistics and prediction: a Parquet file or an Arrow table.
+SourceType = pathlib.Path | pyarrow.Table
+
+
+def write_arrow(
+    data: pandas.DataFrame | pyarrow.Table | pyarrow.RecordBatchReader,
+    output_path: pathlib.Path,
+) -> int:
+    # Uncompressed Arrow IPC file (Feather v2), written under a temporary name. A reader is
+    # written batch by batch, so memory is bounded by its batches.
+    if isinstance(data, pandas.DataFrame):
+        data = pyarrow.Table.from_pandas(data)
+    if isinstance(data, pyarrow.Table):
+        data = pyarrow.RecordBatchReader.from_batches(data.schema, data.to_batches())
+    rows = 0
+    temp_path = output_path.with_name(f"{output_path.name}.tmp")
+    with pyarrow.ipc.new_file(temp_path, data.schema) as writer:
+        for batch in data:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    temp_path.replace(output_path)
+    return rows
+
+
+def read_arrow(path: pathlib.Path) -> pyarrow.Table:
+    # Zero copy: the buffers of the table point into the memory map, which stays open
+    # as long as any of them is referenced, even after the file is deleted.
+    return pyarrow.ipc.open_file(pyarrow.memory_map(str(path))).read_all()
+
+
+def read_frame(source: SourceType, columns: typing.Sequence[str] | None = None) -> pandas.DataFrame:
+    if isinstance(source, pyarrow.Table):
+        table = source.select(list(columns)) if columns is not None else source
+        return table.to_pandas()
+    return read_parquet(source, columns=columns)
@@ -0,0 +1,66 @@
+import pathlib
+import typing
+
+import pyarrow
+import pyarrow.parquet
+
+from .parquet import ProfileType, open_parquet, write_batches
+
+DEFAULT_MEMORY_LIMIT = 256 * 2**20
+
+
+def unify_schemas(input_paths: typing.Sequence[pathlib.Path]) -> pyarrow.Schema:
+    # Only the footers are read. Columns missing in some files are kept and filled with nulls
+    # later, columns with different types are promoted (e.g. int64 and double to double).
+    schemas = [pyarrow.parquet.read_schema(path) for path in input_paths]
+    schema = pyarrow.unify_schemas(schemas, promote_options="permissive")
+    fields = [field for field in schema if not field.name.startswith("__index_level_")]
+    return pyarrow.schema(fields)
+
+
+def conform(batch: pyarrow.RecordBatch, schema: pyarrow.Schema) -> pyarrow.RecordBatch:
+    names = set(batch.schema.names)
+    columns = [
+        (
+            batch.column(field.name).cast(field.type)
+            if field.name in names
+            else pyarrow.nulls(batch.num_rows, field.type)
+        )
+        for field in schema
+    ]
+    return pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def batch_size(file: pyarrow.parquet.ParquetFile, memory_limit: int) -> int:
+    # Uncompressed size of the data pages is used as the estimate of the in-memory size.
+    metadata = file.metadata
+    size = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    row_size = max(1, size // max(1, metadata.num_rows))
+    return max(1, memory_limit // row_size)
+
+
+def concat_reader(
+    input_paths: typing.Sequence[pathlib.Path],
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+) -> pyarrow.RecordBatchReader:
+    # Batches of all files in order, each batch is read only when it is consumed.
+    schema = unify_schemas(input_paths)
+
+    def batches() -> typing.Iterator[pyarrow.RecordBatch]:
+        for path in input_paths:
+            file = open_parquet(path)
+            columns = [name for name in file.schema_arrow.names if name in schema.names]
+            for batch in file.iter_batches(batch_size(file, memory_limit), columns=columns):
+                yield conform(batch, schema)
+
+    return pyarrow.RecordBatchReader.from_batches(schema, batches())
+
+
+def concat_parquet(
+    input_paths: typing.Sequence[pathlib.Path],
+    output_path: pathlib.Path,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    profile: ProfileType = None,
+) -> int:
+    # Peak memory is about one batch of `memory_limit` bytes instead of the whole dataset.
+    return write_batches(concat_reader(input_paths, memory_limit), output_path, profile)
@@ -0,0 +1,131 @@
+import importlib.util
+import logging
+import os
+import pathlib
+import typing
+
+import pandas
+import pyarrow
+import pyarrow.compute
+
+# Readers of the first sheet, in order of preference for `auto`. `calamine` (Rust, installed by
+# `pandas[excel]`) and `openpyxl` (read-only streaming mode) read straight into Arrow arrays,
+# `pandas` is `pandas.read_excel` and its object columns.
+ENGINES = ["calamine", "openpyxl", "pandas"]
+MODULES = {"calamine": "python_calamine", "openpyxl": "openpyxl", "pandas": "pandas"}
+# Used when a pipeline does not ask for an engine, see `benchmark/excel_engines.py`.
+DEFAULT_ENGINE = os.environ.get("EXCEL_ENGINE", "auto")
+
+logger = logging.getLogger(__name__)
+
+EngineType = str | None
+DTypesType = typing.Mapping[str, pyarrow.DataType | str] | None
+RowsType = list[typing.Sequence[typing.Any]]
+
+
+def available_engines() -> list[str]:
+    return [engine for engine in ENGINES if importlib.util.find_spec(MODULES[engine]) is not None]
+
+
+def get_engine(engine: EngineType = None) -> str:
+    name = engine or DEFAULT_ENGINE
+    if name == "auto":
+        return available_engines()[0]
+    if name not in ENGINES:
+        raise ValueError(f"Unknown Excel engine: '{name}'")
+    return name
+
+
+def calamine_rows(path: pathlib.Path) -> RowsType:
+    import python_calamine
+
+    workbook = python_calamine.CalamineWorkbook.from_path(str(path))
+    rows = workbook.get_sheet_by_index(0).to_python(skip_empty_area=False)
+    # Empty cells are empty strings.
+    return [[None if value == "" else value for value in row] for row in rows]
+
+
+def openpyxl_rows(path: pathlib.Path) -> RowsType:
+    import openpyxl
+
+    # Rows are parsed from the XML one by one, no cell objects are kept.
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        return list(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()  # read-only workbooks keep the file open
+
+
+READERS: dict[str, typing.Callable[[pathlib.Path], RowsType]] = {
+    "calamine": calamine_rows,
+    "openpyxl": openpyxl_rows,
+}
+
+
+def to_array(
+    values: typing.Sequence[typing.Any],
+    dtype: pyarrow.DataType | str | None,
+) -> pyarrow.Array:
+    array = pyarrow.array(values)
+    if dtype is not None:
+        return array.cast(dtype)  # safe cast, fails instead of truncating
+    # Typed like by `pandas.read_excel`: whole numbers without missing values are integers,
+    # other numbers and empty columns are floats, dates are timestamps.
+    if pyarrow.types.is_null(array.type):
+        return array.cast(pyarrow.float64())
+    if pyarrow.types.is_date(array.type):
+        return array.cast(pyarrow.timestamp("us"))
+    if pyarrow.types.is_floating(array.type) and array.null_count == 0 and len(array) > 0:
+        whole = pyarrow.compute.equal(array, pyarrow.compute.floor(array))
+        if pyarrow.compute.all(whole).as_py():
+            return array.cast(pyarrow.int64())
+    if pyarrow.types.is_integer(array.type) and array.null_count > 0:
+        return array.cast(pyarrow.float64())
+    return array
+
+
+def rows_to_table(rows: RowsType, dtypes: DTypesType = None) -> pyarrow.Table:
+    # The first row is the header, trailing empty rows are ignored like by `pandas.read_excel`.
+    while len(rows) > 1 and all(value is None for value in rows[-1]):
+        rows = rows[:-1]
+    if len(rows) == 0:
+        raise ValueError("Empty sheet")
+    names = list(rows[0])
+    if not all(isinstance(name, str) for name in names) or len(set(names)) < len(names):
+        raise ValueError("Header with missing, duplicate or non-text column names")
+    dtypes = dtypes or {}
+    arrays = [
+        to_array([row[i] if i < len(row) else None for row in rows[1:]], dtypes.get(name))
+        for i, name in enumerate(names)
+    ]
+    return pyarrow.Table.from_arrays(arrays, names=names)
+
+
+def read_excel(
+    path: pathlib.Path,
+    engine: EngineType = None,
+    dtypes: DTypesType = None,
+) -> pyarrow.Table:
+    # First sheet as an Arrow table, columns in `dtypes` are cast to the given Arrow types
+    # ("int64", "float64", "string", ...) and the others inferred by Arrow, without object
+    # columns. An engine that is not installed, or a sheet its rows do not convert (e.g. a
+    # column mixing numbers and text, an unnamed column), falls back to `pandas.read_excel`
+    # with a warning.
+    name = get_engine(engine)
+    if name != "pandas":
+        try:
+            rows = READERS[name](path)
+        except ImportError as error:
+            logger.warning(f"Excel engine '{name}' is not installed, using pandas: {error}")
+        else:
+            try:
+                return rows_to_table(rows, dtypes)
+            except (ValueError, TypeError, pyarrow.ArrowException) as error:
+                message = f"Excel engine '{name}' cannot convert {path}, using pandas: {error!r}"
+                logger.warning(message)
+    table = pyarrow.Table.from_pandas(pandas.read_excel(path), preserve_index=False)
+    for column, dtype in (dtypes or {}).items():
+        index = table.schema.get_field_index(column)
+        if index >= 0:
+            table = table.set_column(index, column, table.column(column).cast(dtype))
+    return table
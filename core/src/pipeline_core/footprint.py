@@ -0,0 +1,181 @@
+import dataclasses
+import typing
+
+import numpy
+import pandas
+import pyarrow
+import pyarrow.compute
+
+# Signed integer types from the smallest, with their ranges.
+INTEGER_TYPES = {
+    data_type: numpy.iinfo(data_type.to_pandas_dtype())
+    for data_type in [pyarrow.int8(), pyarrow.int16(), pyarrow.int32(), pyarrow.int64()]
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Footprint:
+    # Largest relative error of a float64 column stored as float32, 0 only stores columns
+    # whose values are all exactly representable.
+    tolerance: float = 0.0
+    # Text columns with at most this many distinct values are dictionary encoded.
+    max_categories: int = 256
+
+
+class ColumnReport(typing.TypedDict):
+    type_before: str
+    type_after: str
+    bytes_before: int
+    bytes_after: int
+
+
+class FootprintReport(typing.TypedDict):
+    num_rows: int
+    bytes_before: int
+    bytes_after: int
+    columns: dict[str, ColumnReport]
+
+
+@dataclasses.dataclass
+class ColumnPlan:
+    # What one pass over the batches found out about a column.
+    field: pyarrow.Field
+    nbytes: int = 0
+    low: int | None = None
+    high: int | None = None
+    max_error: float = 0.0
+    categories: set[typing.Any] = dataclasses.field(default_factory=set)
+
+    def update(self, array: pyarrow.Array, footprint: Footprint) -> None:
+        self.nbytes += array.nbytes
+        data_type = self.field.type
+        if pyarrow.types.is_integer(data_type) and array.null_count < len(array):
+            bounds = pyarrow.compute.min_max(array).as_py()
+            self.low = bounds["min"] if self.low is None else min(self.low, bounds["min"])
+            self.high = bounds["max"] if self.high is None else max(self.high, bounds["max"])
+        elif pyarrow.types.is_float64(data_type) and self.max_error <= footprint.tolerance:
+            rounded = array.cast(pyarrow.float32(), safe=False).cast(pyarrow.float64())
+            error = pyarrow.compute.abs(pyarrow.compute.subtract(rounded, array))
+            relative = pyarrow.compute.divide(error, pyarrow.compute.abs(array))
+            # Exact values (zeros, infinities) and NaN have no error, an overflow an infinite one.
+            exact = pyarrow.compute.or_(
+                pyarrow.compute.equal(rounded, array), pyarrow.compute.is_nan(array)
+            )
+            relative = pyarrow.compute.if_else(exact, 0.0, relative)
+            self.max_error = max(self.max_error, pyarrow.compute.max(relative).as_py() or 0.0)
+        elif is_text(data_type) and len(self.categories) <= footprint.max_categories:
+            self.categories.update(pyarrow.compute.unique(array.drop_null()).to_pylist())
+
+    def target_type(self, footprint: Footprint) -> pyarrow.DataType:
+        data_type = self.field.type
+        if pyarrow.types.is_signed_integer(data_type) and self.low is not None:
+            for integer_type, info in INTEGER_TYPES.items():
+                if info.min <= self.low and self.high <= info.max:
+                    return integer_type
+        if pyarrow.types.is_float64(data_type) and self.max_error <= footprint.tolerance:
+            return pyarrow.float32()
+        if is_text(data_type) and len(self.categories) <= footprint.max_categories:
+            index_type = next(
+                integer_type
+                for integer_type, info in INTEGER_TYPES.items()
+                if len(self.categories) <= info.max
+            )
+            return pyarrow.dictionary(index_type, data_type)
+        return data_type
+
+    def estimate_nbytes(self, data_type: pyarrow.DataType, num_rows: int) -> int:
+        # Fixed-width columns scale with the width, a dictionary is its indices and values.
+        if pyarrow.types.is_dictionary(data_type):
+            values = sum(len(str(value)) for value in self.categories)
+            return num_rows * data_type.index_type.bit_width // 8 + values
+        if data_type == self.field.type:
+            return self.nbytes
+        return self.nbytes * data_type.bit_width // self.field.type.bit_width
+
+
+def is_text(data_type: pyarrow.DataType) -> bool:
+    return pyarrow.types.is_string(data_type) or pyarrow.types.is_large_string(data_type)
+
+
+def plan_footprint(
+    batches: typing.Iterable[pyarrow.RecordBatch],
+    schema: pyarrow.Schema,
+    footprint: Footprint,
+) -> tuple[pyarrow.Schema, FootprintReport]:
+    # Smallest types that hold all values of every column (within the float tolerance),
+    # found in one pass over the batches, with the memory of the columns before and after.
+    plans = {field.name: ColumnPlan(field) for field in schema}
+    num_rows = 0
+    for batch in batches:
+        num_rows += batch.num_rows
+        for name, plan in plans.items():
+            plan.update(batch.column(name), footprint)
+    fields = []
+    columns: dict[str, ColumnReport] = {}
+    for name, plan in plans.items():
+        data_type = plan.target_type(footprint)
+        fields.append(pyarrow.field(name, data_type, plan.field.nullable))
+        columns[name] = {
+            "type_before": str(plan.field.type),
+            "type_after": str(data_type),
+            "bytes_before": plan.nbytes,
+            "bytes_after": plan.estimate_nbytes(data_type, num_rows),
+        }
+    report: FootprintReport = {
+        "num_rows": num_rows,
+        "bytes_before": sum(column["bytes_before"] for column in columns.values()),
+        "bytes_after": sum(column["bytes_after"] for column in columns.values()),
+        "columns": columns,
+    }
+    return (pyarrow.schema(fields, metadata=schema.metadata), report)
+
+
+def cast_batch(batch: pyarrow.RecordBatch, schema: pyarrow.Schema) -> pyarrow.RecordBatch:
+    # The plan already checked the values, floats are rounded to float32 without a check.
+    columns = [
+        pyarrow.compute.cast(batch.column(field.name), field.type, safe=False) for field in schema
+    ]
+    return pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def optimize_table(
+    data: pandas.DataFrame | pyarrow.Table,
+    footprint: Footprint,
+) -> tuple[pyarrow.Table, FootprintReport]:
+    table = data if isinstance(data, pyarrow.Table) else pyarrow.Table.from_pandas(data)
+    schema, report = plan_footprint(table.to_batches(), table.schema, footprint)
+    batches = [cast_batch(batch, schema) for batch in table.to_batches()]
+    return (pyarrow.Table.from_batches(batches, schema=schema), report)
+
+
+def optimize_reader(
+    open_reader: typing.Callable[[], pyarrow.RecordBatchReader],
+    footprint: Footprint,
+) -> tuple[pyarrow.RecordBatchReader, FootprintReport]:
+    # Two passes with bounded memory: the first reader is planned, the second one is cast
+    # batch by batch while it is consumed.
+    reader = open_reader()
+    schema, report = plan_footprint(reader, reader.schema, footprint)
+    batches = (cast_batch(batch, schema) for batch in open_reader())
+    return (pyarrow.RecordBatchReader.from_batches(schema, batches), report)
+
+
+def format_bytes(size: float) -> str:
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_report(report: FootprintReport) -> str:
+    before, after = report["bytes_before"], report["bytes_after"]
+    changed = [
+        f"{name}: {column['type_before']} -> {column['type_after']}"
+        for name, column in report["columns"].items()
+        if column["type_before"] != column["type_after"]
+    ]
+    share = after / before if before else 1.0
+    summary = f"Memory of {report['num_rows']} rows: {format_bytes(before)} -> "
+    summary += f"{format_bytes(after)} ({share:.0%})"
+    return "\n".join([summary, *changed])
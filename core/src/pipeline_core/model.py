@@ -0,0 +1,113 @@
+import dataclasses
+import pathlib
+import typing
+
+import numpy
+
+if typing.TYPE_CHECKING:
+    import pyarrow
+
+    from .arrow import SourceType
+    from .parquet import ProfileType
+
+# Increased whenever the arrays stored in a model file change.
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_ROWS = 65536
+
+
+@dataclasses.dataclass
+class LinearModel:
+    # Everything needed to score new data: only NumPy arrays, no sklearn objects.
+    target: str
+    features: list[str]
+    coefficients: numpy.ndarray
+    intercept: float
+    fill: numpy.ndarray  # value imputed into each feature, NaN if missing values are kept
+
+    def save(self, path: pathlib.Path) -> None:
+        # Uncompressed, loading is a few small reads and no unpickling.
+        temp_path = path.with_name(f"{path.name}.tmp")
+        with temp_path.open("wb") as f:
+            numpy.savez(
+                f,
+                version=numpy.array(FORMAT_VERSION),
+                target=numpy.array(self.target, dtype=numpy.str_),
+                features=numpy.array(self.features, dtype=numpy.str_),
+                coefficients=self.coefficients,
+                intercept=numpy.array(self.intercept),
+                fill=self.fill,
+            )
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "LinearModel":
+        with numpy.load(path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported model format version {version} in '{path}'")
+            return cls(
+                target=str(data["target"]),
+                features=data["features"].tolist(),
+                coefficients=data["coefficients"],
+                intercept=float(data["intercept"]),
+                fill=data["fill"],
+            )
+
+    def predict(self, values: numpy.ndarray) -> numpy.ndarray:
+        # `values` has one column per feature and is modified in place.
+        missing = numpy.isnan(values)
+        if missing.any():
+            numpy.copyto(values, self.fill, where=missing)
+        return values @ self.coefficients + self.intercept
+
+
+def prediction_reader(
+    model: LinearModel,
+    source: "SourceType",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> "pyarrow.RecordBatchReader":
+    # Predictions of a Parquet file or an Arrow table in chunks of `chunk_rows`,
+    # only the features are read.
+    import pyarrow
+
+    from .parquet import open_parquet
+
+    if isinstance(source, pyarrow.Table):
+        present = set(source.schema.names)
+    else:
+        file = open_parquet(source)
+        present = set(file.schema_arrow.names)
+    for name, fill in zip(model.features, model.fill):
+        if name not in present and numpy.isnan(fill):
+            raise ValueError(f"Column '{name}' of the model is missing in the data")
+    columns = [name for name in model.features if name in present]
+    index = [model.features.index(name) for name in columns]
+    if isinstance(source, pyarrow.Table):
+        chunks = source.select(columns).to_batches(max_chunksize=chunk_rows)
+    else:
+        chunks = file.iter_batches(batch_size=chunk_rows, columns=columns)
+    schema = pyarrow.schema([(model.target, pyarrow.float64())])
+    buffer = numpy.empty((chunk_rows, len(model.features)), dtype=numpy.float64, order="F")
+
+    def batches() -> typing.Iterator[pyarrow.RecordBatch]:
+        for batch in chunks:
+            values = buffer[: batch.num_rows]
+            values[:] = model.fill  # features missing in the file are imputed
+            for i, column in zip(index, batch.columns):
+                column = column.cast(pyarrow.float64())
+                values[:, i] = column.to_numpy(zero_copy_only=False)
+            yield pyarrow.record_batch([model.predict(values)], schema=schema)
+
+    return pyarrow.RecordBatchReader.from_batches(schema, batches())
+
+
+def predict_parquet(
+    model: LinearModel,
+    source: "SourceType",
+    output_path: pathlib.Path,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    profile: "ProfileType" = None,
+) -> int:
+    from .parquet import write_batches
+
+    return write_batches(prediction_reader(model, source, chunk_rows), output_path, profile)
@@ -0,0 +1,112 @@
+import dataclasses
+import os
+import pathlib
+import typing
+
+import pandas
+import pyarrow
+import pyarrow.parquet
+
+
+@dataclasses.dataclass(frozen=True)
+class WriteProfile:
+    compression: str = "snappy"
+    compression_level: int | None = None
+    row_group_size: int = 1024 * 1024  # rows
+    use_dictionary: bool = True
+    # Measured values rarely repeat, a dictionary of floats is built and then thrown away.
+    dictionary_floats: bool = True
+
+    def writer_options(self, schema: pyarrow.Schema) -> dict[str, typing.Any]:
+        # Column statistics are always written, null counts are read from the footer.
+        use_dictionary: bool | list[str] = self.use_dictionary
+        if self.use_dictionary and not self.dictionary_floats:
+            use_dictionary = [
+                field.name for field in schema if not pyarrow.types.is_floating(field.type)
+            ]
+        return {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "use_dictionary": use_dictionary,
+            "write_statistics": True,
+        }
+
+
+PROFILES = {
+    # What `DataFrame.to_parquet` writes.
+    "default": WriteProfile(),
+    # Cheap to write and read, smaller than the default.
+    "fast": WriteProfile(compression="zstd", compression_level=1, dictionary_floats=False),
+    # Intermediates read again right away, no encoding or decompression at all.
+    "hot": WriteProfile(compression="none", use_dictionary=False),
+    # Outputs kept for a long time, slow to write.
+    "archive": WriteProfile(compression="zstd", compression_level=9, dictionary_floats=False),
+}
+# Used when a pipeline does not ask for a profile, see `benchmark/parquet_profiles.py`.
+DEFAULT_PROFILE = os.environ.get("PARQUET_PROFILE", "fast")
+
+ProfileType = str | WriteProfile | None
+
+
+def get_profile(profile: ProfileType = None) -> WriteProfile:
+    if isinstance(profile, WriteProfile):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown Parquet write profile: '{name}'")
+    return PROFILES[name]
+
+
+def write_parquet(
+    data: pandas.DataFrame | pyarrow.Table,
+    output_path: pathlib.Path,
+    profile: ProfileType = None,
+) -> None:
+    # Written under a temporary name, the file appears only after it is complete.
+    write_profile = get_profile(profile)
+    table = data if isinstance(data, pyarrow.Table) else pyarrow.Table.from_pandas(data)
+    temp_path = output_path.with_name(f"{output_path.name}.tmp")
+    pyarrow.parquet.write_table(
+        table,
+        temp_path,
+        row_group_size=write_profile.row_group_size,
+        **write_profile.writer_options(table.schema),
+    )
+    temp_path.replace(output_path)
+
+
+def write_batches(
+    reader: pyarrow.RecordBatchReader,
+    output_path: pathlib.Path,
+    profile: ProfileType = None,
+) -> int:
+    # Batches larger than the profile's row group are split, smaller ones are row groups.
+    write_profile = get_profile(profile)
+    rows = 0
+    temp_path = output_path.with_name(f"{output_path.name}.tmp")
+    options = write_profile.writer_options(reader.schema)
+    with pyarrow.parquet.ParquetWriter(temp_path, reader.schema, **options) as writer:
+        for batch in reader:
+            writer.write_batch(batch, row_group_size=write_profile.row_group_size)
+            rows += batch.num_rows
+    temp_path.replace(output_path)
+    return rows
+
+
+def open_parquet(path: pathlib.Path, memory_map: bool = True) -> pyarrow.parquet.ParquetFile:
+    return pyarrow.parquet.ParquetFile(path, memory_map=memory_map)
+
+
+def read_parquet(
+    path: pathlib.Path,
+    columns: typing.Sequence[str] | None = None,
+    memory_map: bool = True,
+) -> pandas.DataFrame:
+    # Only the projected columns are read, a memory map avoids copying the file into buffers.
+    table = pyarrow.parquet.read_table(
+        path,
+        columns=columns,
+        memory_map=memory_map,
+        use_pandas_metadata=True,
+    )
+    return table.to_pandas()
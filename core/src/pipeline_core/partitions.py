@@ -0,0 +1,86 @@
+import datetime
+import pathlib
+
+import pyarrow
+import pyarrow.dataset
+
+from .concat import unify_schemas
+
+# Hive layout of the per-date files: `<root>/date=YYYY-MM-DD/part-0.parquet`, the date is
+# only in the directory name and the files have the same columns as the concatenated data.
+PARTITIONING = pyarrow.dataset.partitioning(
+    pyarrow.schema([pyarrow.field("date", pyarrow.date32())]), flavor="hive"
+)
+FILE_NAME = "part-0.parquet"
+
+
+def partition_path(root: pathlib.Path, date: datetime.date) -> pathlib.Path:
+    return root / f"date={date.isoformat()}" / FILE_NAME
+
+
+def date_window(
+    end: datetime.date,
+    days: int,
+) -> tuple[datetime.date, datetime.date]:
+    # The last `days` days up to and including `end`.
+    return (end - datetime.timedelta(days=days - 1), end)
+
+
+def window_filter(
+    start: datetime.date | None,
+    end: datetime.date | None,
+) -> pyarrow.dataset.Expression | None:
+    date = pyarrow.dataset.field("date")
+    expression = None
+    if start is not None:
+        expression = date >= pyarrow.scalar(start, pyarrow.date32())
+    if end is not None:
+        bound = date <= pyarrow.scalar(end, pyarrow.date32())
+        expression = bound if expression is None else expression & bound
+    return expression
+
+
+def partition_paths(
+    root: pathlib.Path,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+) -> list[pathlib.Path]:
+    # Files of the partitions in the window, in date order. Partitions outside of it are pruned
+    # by their directory name, their files are never opened.
+    dataset = pyarrow.dataset.dataset(
+        root, format="parquet", partitioning=PARTITIONING, exclude_invalid_files=False
+    )
+    fragments = dataset.get_fragments(filter=window_filter(start, end))
+    # Files outside of any partition cannot be pruned, their partition expression is `true`.
+    # Files being written have a temporary suffix.
+    unpartitioned = pyarrow.dataset.scalar(True)
+    return sorted(
+        pathlib.Path(fragment.path)
+        for fragment in fragments
+        if not fragment.partition_expression.equals(unpartitioned)
+        and fragment.path.endswith(".parquet")
+    )
+
+
+def open_window(
+    root: pathlib.Path,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+) -> pyarrow.dataset.Dataset:
+    # The partitions in the window as one dataset, with the columns unified like by
+    # `concat_reader`: missing columns are nulls, different types are promoted.
+    paths = partition_paths(root, start, end)
+    if len(paths) == 0:
+        raise ValueError(f"No partitions in '{root}' from {start} to {end}")
+    return pyarrow.dataset.dataset(
+        [str(path) for path in paths], schema=unify_schemas(paths), format="parquet"
+    )
+
+
+def read_window(
+    root: pathlib.Path,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    columns: list[str] | None = None,
+) -> pyarrow.Table:
+    return open_window(root, start, end).to_table(columns=columns)
@@ -0,0 +1,304 @@
+import dataclasses
+import functools
+import pathlib
+import typing
+
+import numpy
+
+from .model import LinearModel
+
+if typing.TYPE_CHECKING:
+    import pyarrow
+
+
+def adjusted_r2_score(r2: float, n: int, p: int) -> float:
+    return 1 - (1 - r2) * (n - 1) / (n - p - 1)
+
+
+def float_block(
+    data: "pyarrow.Table | pyarrow.RecordBatch",
+    columns: typing.Sequence[str],
+) -> numpy.ndarray:
+    # The columns as one float64 array in column-major order, every column contiguous, nulls
+    # are NaN. Each Arrow column (chunk) is converted straight into its slot of the array.
+    import pyarrow
+
+    values = numpy.empty((data.num_rows, len(columns)), dtype=numpy.float64, order="F")
+    for i, name in enumerate(columns):
+        column = data.column(name)
+        chunks = column.chunks if isinstance(column, pyarrow.ChunkedArray) else [column]
+        start = 0
+        for chunk in chunks:
+            converted = chunk.cast(pyarrow.float64()).to_numpy(zero_copy_only=False)
+            values[start : start + len(chunk), i] = converted
+            start += len(chunk)
+    return values
+
+
+class Moments:
+    # Sufficient statistics for least squares on data with missing values. For every pair
+    # of columns (j, k) over the rows where both are observed: the number of rows `count`,
+    # the sum of column j `sum` and the sum of products `cross`. Any column subset or mean
+    # imputation can be solved from them without reading the data again, and moments of
+    # different files are simply added up. Values are stored shifted by `shift` (the means
+    # of the first batch) to avoid cancellation when the columns are far from zero.
+
+    def __init__(
+        self,
+        columns: list[str],
+        shift: numpy.ndarray,
+        rows: int,
+        count: numpy.ndarray,
+        sum: numpy.ndarray,
+        cross: numpy.ndarray,
+    ) -> None:
+        self.columns = columns
+        self.shift = shift
+        self.rows = rows
+        self.count = count
+        self.sum = sum
+        self.cross = cross
+
+    @classmethod
+    def from_array(
+        cls,
+        columns: list[str],
+        values: numpy.ndarray,
+        shift: numpy.ndarray | None = None,
+    ) -> "Moments":
+        observed = ~numpy.isnan(values)
+        ones = observed.astype(numpy.float64)
+        if shift is None:
+            counts = ones.sum(axis=0)
+            sums = numpy.where(observed, values, 0.0).sum(axis=0)
+            shift = numpy.divide(sums, counts, out=numpy.zeros_like(sums), where=counts > 0)
+        shifted = numpy.where(observed, values - shift, 0.0)
+        return cls(
+            columns=list(columns),
+            shift=shift,
+            rows=values.shape[0],
+            count=ones.T @ ones,
+            sum=shifted.T @ ones,
+            cross=shifted.T @ shifted,
+        )
+
+    @classmethod
+    def from_batch(
+        cls,
+        batch: "pyarrow.RecordBatch",
+        shift: numpy.ndarray | None = None,
+    ) -> "Moments":
+        from .statistics import is_numeric
+
+        columns = [field.name for field in batch.schema if is_numeric(field.type)]
+        return cls.from_array(columns, float_block(batch, columns), shift)
+
+    def reindex(self, columns: list[str], shift: numpy.ndarray) -> "Moments":
+        # Moments of the same rows for a superset of columns (the new ones never observed)
+        # with a different shift: z + d, where d is the difference of the shifts.
+        index = numpy.array([columns.index(name) for name in self.columns], dtype=numpy.intp)
+        size = len(columns)
+        count = numpy.zeros((size, size))
+        sum = numpy.zeros((size, size))
+        cross = numpy.zeros((size, size))
+        count[numpy.ix_(index, index)] = self.count
+        sum[numpy.ix_(index, index)] = self.sum
+        cross[numpy.ix_(index, index)] = self.cross
+        delta = numpy.zeros(size)
+        delta[index] = self.shift - shift[index]
+        shifted = sum * delta[numpy.newaxis, :]
+        cross = cross + shifted + shifted.T + numpy.outer(delta, delta) * count
+        sum = sum + delta[:, numpy.newaxis] * count
+        return Moments(list(columns), shift, self.rows, count, sum, cross)
+
+    def merge(self, other: "Moments") -> "Moments":
+        columns = self.columns + [name for name in other.columns if name not in self.columns]
+        # The shift of `self`, of `other` for its new columns. Empty moments have no data to be
+        # centred on, the shift of `other` is taken for all columns.
+        shifts = dict(zip(other.columns, other.shift))
+        if self.rows > 0:
+            shifts.update(zip(self.columns, self.shift))
+        shift = numpy.array([shifts.get(name, 0.0) for name in columns])
+        left = self if columns == self.columns else self.reindex(columns, shift)
+        right = other.reindex(columns, shift)
+        return Moments(
+            columns=columns,
+            shift=shift,
+            rows=left.rows + right.rows,
+            count=left.count + right.count,
+            sum=left.sum + right.sum,
+            cross=left.cross + right.cross,
+        )
+
+    def means(self) -> dict[str, float]:
+        count = numpy.diag(self.count)
+        sum = numpy.diag(self.sum)
+        return {
+            name: float(sum[i] / count[i] + self.shift[i])
+            for i, name in enumerate(self.columns)
+            if count[i] > 0
+        }
+
+    def save(self, path: pathlib.Path) -> None:
+        temp_path = path.with_name(f"{path.name}.tmp")
+        with temp_path.open("wb") as f:
+            numpy.savez(
+                f,
+                columns=numpy.array(self.columns, dtype=numpy.str_),
+                shift=self.shift,
+                rows=numpy.array(self.rows),
+                count=self.count,
+                sum=self.sum,
+                cross=self.cross,
+            )
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "Moments":
+        with numpy.load(path, allow_pickle=False) as data:
+            return cls(
+                columns=data["columns"].tolist(),
+                shift=data["shift"],
+                rows=int(data["rows"]),
+                count=data["count"],
+                sum=data["sum"],
+                cross=data["cross"],
+            )
+
+
+def compute_moments(
+    path: pathlib.Path,
+    memory_limit: int | None = None,
+) -> Moments:
+    # Numeric columns of a Parquet file read batch by batch, memory does not depend on the rows.
+    # Parquet and pandas are imported only here, fitting from saved moments needs NumPy alone.
+    from .concat import DEFAULT_MEMORY_LIMIT, batch_size
+    from .parquet import open_parquet
+    from .statistics import is_numeric
+
+    file = open_parquet(path)
+    columns = [
+        field.name
+        for field in file.schema_arrow
+        if is_numeric(field.type) and not field.name.startswith("__index_level_")
+    ]
+    rows = batch_size(file, memory_limit or DEFAULT_MEMORY_LIMIT)
+    moments = Moments.from_array(columns, numpy.empty((0, len(columns))))
+    for batch in file.iter_batches(rows, columns=columns):
+        shift = moments.shift if moments.rows > 0 else None
+        moments = moments.merge(Moments.from_batch(batch, shift))
+    return moments
+
+
+def merge_moments(moments: typing.Iterable[Moments]) -> Moments:
+    return functools.reduce(Moments.merge, moments)
+
+
+def load_moments(paths: typing.Iterable[pathlib.Path]) -> Moments:
+    return merge_moments(Moments.load(path) for path in paths)
+
+
+@dataclasses.dataclass
+class LinearFit:
+    target: str
+    features: list[str]
+    coefficients: numpy.ndarray
+    intercept: float
+    fill: dict[str, float]  # values imputed into the missing values of each column
+    rows: int
+    r2: float
+
+    @property
+    def r2_adj(self) -> float:
+        return adjusted_r2_score(r2=self.r2, n=self.rows, p=len(self.features))
+
+    def to_model(self) -> LinearModel:
+        fill = [self.fill.get(name, numpy.nan) for name in self.features]
+        return LinearModel(
+            target=self.target,
+            features=self.features,
+            coefficients=self.coefficients,
+            intercept=self.intercept,
+            fill=numpy.array(fill, dtype=numpy.float64),
+        )
+
+
+def clean_columns(moments: Moments, method: str, threshold: float) -> tuple[list[str], bool]:
+    # Columns left by the cleaning method and whether their missing values are imputed.
+    if method == "drop":
+        observed = numpy.diag(moments.count)
+        columns = [
+            name
+            for name, count in zip(moments.columns, observed)
+            if not (moments.rows - count) / moments.rows > threshold
+        ]
+        if len(columns) == 0:
+            raise ValueError("No columns left after dropping")
+        return (columns, False)
+    if method == "impute":
+        return (list(moments.columns), True)
+    raise NotImplementedError(f"Unknown method: '{method}'")
+
+
+def filled_moments(
+    moments: Moments,
+    index: numpy.ndarray,
+    impute: bool,
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    # Means, covariance (times the rows) and fill values of the columns `index` with their
+    # missing values replaced by their means (or by nothing, when all must be observed).
+    block = numpy.ix_(index, index)
+    count, sum, cross = moments.count[block], moments.sum[block], moments.cross[block]
+    rows = moments.rows
+    observed = numpy.diag(count)
+    fill = numpy.zeros(len(index))
+    if impute:
+        # Columns without any observed value are left at zero, they cannot be imputed.
+        numpy.divide(numpy.diag(sum), observed, out=fill, where=observed > 0)
+    missing = rows - observed
+    partial = numpy.diag(sum)[:, numpy.newaxis] - sum  # column j where j is observed and k not
+    filled = partial * fill[numpy.newaxis, :]
+    both_missing = rows - observed[:, numpy.newaxis] - observed[numpy.newaxis, :] + count
+    total = numpy.diag(sum) + missing * fill
+    products = cross + filled + filled.T + numpy.outer(fill, fill) * both_missing
+    mean = total / rows
+    return (mean, products - rows * numpy.outer(mean, mean), fill)
+
+
+def solve(moments: Moments, columns: list[str], impute: bool) -> LinearFit:
+    # Least squares of the first column on the others, the same as `LinearRegression`
+    # fitted on the selected (and imputed) columns of the concatenated data.
+    index = numpy.array([moments.columns.index(name) for name in columns], dtype=numpy.intp)
+    rows = moments.rows
+    observed = numpy.diag(moments.count)[index]
+    if impute and numpy.any(observed == 0) or not impute and numpy.any(observed < rows):
+        raise ValueError("Input contains NaN")
+    # Moments of the data with the missing values replaced by `fill`.
+    mean, covariance, fill = filled_moments(moments, index, impute)
+    xx, xy, yy = covariance[1:, 1:], covariance[1:, 0], covariance[0, 0]
+    coefficients = numpy.linalg.lstsq(xx, xy, rcond=None)[0]
+    residual = yy - 2 * coefficients @ xy + coefficients @ xx @ coefficients
+    if yy > 0:
+        r2 = 1 - residual / yy
+    else:
+        r2 = 1.0 if numpy.isclose(residual, 0.0) else 0.0
+    shift = moments.shift[index]
+    intercept = (mean[0] + shift[0]) - (mean[1:] + shift[1:]) @ coefficients
+    return LinearFit(
+        target=columns[0],
+        features=columns[1:],
+        coefficients=coefficients,
+        intercept=float(intercept),
+        fill={
+            name: float(value + offset)
+            for name, value, offset in zip(columns, fill, shift)
+            if impute
+        },
+        rows=rows,
+        r2=float(r2),
+    )
+
+
+def fit_linear_model(moments: Moments, method: str, threshold: float = 0.2) -> LinearFit:
+    columns, impute = clean_columns(moments, method, threshold)
+    return solve(moments, columns, impute)
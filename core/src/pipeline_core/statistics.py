@@ -0,0 +1,157 @@
+import json
+import pathlib
+import typing
+
+import pandas
+import pyarrow
+import pyarrow.compute
+import pyarrow.parquet
+
+from .arrow import SourceType, read_frame
+from .concat import DEFAULT_MEMORY_LIMIT, batch_size
+from .parquet import open_parquet
+
+
+class ColumnStatistics(typing.TypedDict):
+    null_count: int
+    count: int  # non-null values
+    sum: float | None  # numeric columns only
+
+
+class Statistics(typing.TypedDict):
+    num_rows: int
+    columns: dict[str, ColumnStatistics]
+
+
+def footer_statistics(metadata: pyarrow.parquet.FileMetaData) -> pandas.DataFrame:
+    # Null counts and min/max of each column merged from the statistics of all row groups,
+    # a null count is missing if any row group has no statistics.
+    statistics: dict[str, dict[str, typing.Any]] = {}
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            merged = statistics.setdefault(
+                column.path_in_schema, {"null_count": 0, "min": None, "max": None}
+            )
+            stats = column.statistics
+            if stats is None or not stats.has_null_count or merged["null_count"] is None:
+                merged["null_count"] = None
+            else:
+                merged["null_count"] += stats.null_count
+            if stats is not None and stats.has_min_max:
+                low, high = stats.min, stats.max
+                merged["min"] = low if merged["min"] is None else min(merged["min"], low)
+                merged["max"] = high if merged["max"] is None else max(merged["max"], high)
+    return pandas.DataFrame.from_dict(
+        statistics, orient="index", columns=["null_count", "min", "max"]
+    )
+
+
+def is_numeric(data_type: pyarrow.DataType) -> bool:
+    return (
+        pyarrow.types.is_integer(data_type)
+        or pyarrow.types.is_floating(data_type)
+        or pyarrow.types.is_boolean(data_type)
+    )
+
+
+def compute_statistics(
+    source: SourceType,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+) -> Statistics:
+    if isinstance(source, pyarrow.Table):
+        return table_statistics(source)
+    # Null counts are taken from the footer. Only the numeric columns (for their sums)
+    # and columns without null counts in the footer are read, batch by batch.
+    file = open_parquet(source)
+    fields = [field for field in file.schema_arrow if not field.name.startswith("__index_level_")]
+    footer = footer_statistics(file.metadata)["null_count"].to_dict()
+    null_counts = {field.name: footer.get(field.name) for field in fields}
+    sums = {field.name: 0.0 for field in fields if is_numeric(field.type)}
+    missing = [name for name, null_count in null_counts.items() if null_count is None]
+    columns = [field.name for field in fields if field.name in sums or field.name in missing]
+    for name in missing:
+        null_counts[name] = 0
+    if columns:
+        for batch in file.iter_batches(batch_size(file, memory_limit), columns=columns):
+            for name in missing:
+                null_counts[name] += batch.column(name).null_count
+            for name in sums:
+                column = batch.column(name).cast(pyarrow.float64())
+                sums[name] += pyarrow.compute.sum(column).as_py() or 0.0
+    return to_statistics(file.metadata.num_rows, fields, null_counts, sums)
+
+
+def table_statistics(table: pyarrow.Table) -> Statistics:
+    # Null counts are kept by the arrays, only the numeric columns are summed.
+    fields = [field for field in table.schema if not field.name.startswith("__index_level_")]
+    null_counts = {field.name: table.column(field.name).null_count for field in fields}
+    sums = {}
+    for field in fields:
+        if is_numeric(field.type):
+            column = table.column(field.name).cast(pyarrow.float64())
+            sums[field.name] = pyarrow.compute.sum(column).as_py() or 0.0
+    return to_statistics(table.num_rows, fields, null_counts, sums)
+
+
+def to_statistics(
+    num_rows: int,
+    fields: list[pyarrow.Field],
+    null_counts: dict[str, int],
+    sums: dict[str, float],
+) -> Statistics:
+    return {
+        "num_rows": num_rows,
+        "columns": {
+            field.name: {
+                "null_count": int(null_counts[field.name]),
+                "count": num_rows - int(null_counts[field.name]),
+                "sum": sums.get(field.name),
+            }
+            for field in fields
+        },
+    }
+
+
+def save_statistics(statistics: Statistics, path: pathlib.Path) -> None:
+    # Replaced atomically like the other outputs, a file is never rewritten in place.
+    temp_path = path.with_name(f"{path.name}.tmp")
+    temp_path.write_text(json.dumps(statistics, indent=2))
+    temp_path.replace(path)
+
+
+def load_statistics(path: pathlib.Path) -> Statistics:
+    return json.loads(path.read_text())
+
+
+def columns_to_keep(statistics: Statistics, threshold: float) -> list[str]:
+    num_rows = statistics["num_rows"]
+    columns = [
+        name
+        for name, column in statistics["columns"].items()
+        if not column["null_count"] / num_rows > threshold
+    ]
+    if len(columns) == 0:
+        raise ValueError("No columns left after dropping")
+    return columns
+
+
+def column_means(statistics: Statistics) -> dict[str, float]:
+    return {
+        name: column["sum"] / column["count"]
+        for name, column in statistics["columns"].items()
+        if column["sum"] is not None and column["count"] > 0
+    }
+
+
+def read_dropped(source: SourceType, statistics: Statistics, threshold: float) -> pandas.DataFrame:
+    # Same as `drop_columns_with_missing_values`, but the dropped columns are never read.
+    return read_frame(source, columns=columns_to_keep(statistics, threshold))
+
+
+def read_imputed(source: SourceType, statistics: Statistics) -> pandas.DataFrame:
+    # Same as `impute_columns_with_mean`, filled in place with the precomputed means.
+    data = read_frame(source)
+    data.fillna(column_means(statistics), inplace=True)
+    return data
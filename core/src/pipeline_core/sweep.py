@@ -0,0 +1,207 @@
+import dataclasses
+import json
+import pathlib
+import typing
+
+import numpy
+
+from .regression import LinearFit, Moments, filled_moments, solve
+
+if typing.TYPE_CHECKING:
+    import pandas
+
+    from .arrow import SourceType
+    from .statistics import Statistics
+
+METHODS = ["drop", "impute"]
+DEFAULT_THRESHOLDS = [round(0.1 * i, 1) for i in range(11)]
+DEFAULT_WINNERS = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class Candidate:
+    # A cleaning strategy: columns with more than `threshold` missing values are dropped and
+    # the missing values of the others imputed (`impute`) or not allowed (`drop`).
+    method: str
+    threshold: float
+    columns: tuple[str, ...]  # target first
+    subset: str = ""  # name of the feature subset the columns were taken from
+
+    @property
+    def impute(self) -> bool:
+        return self.method == "impute"
+
+    @property
+    def name(self) -> str:
+        name = f"{self.method}_{self.threshold:g}"
+        return f"{name}_{self.subset}" if self.subset else name
+
+
+@dataclasses.dataclass
+class SweepResult:
+    candidate: Candidate
+    r2: float
+    r2_adj: float
+
+
+class CandidateReport(typing.TypedDict):
+    name: str
+    method: str
+    threshold: float
+    features: list[str]
+    r2: float
+    r2_adj: float
+
+
+class SweepReport(typing.TypedDict):
+    rows: int
+    candidates: list[CandidateReport]  # best first
+    winners: list[str]
+
+
+def sweep_candidates(
+    moments: Moments,
+    thresholds: typing.Iterable[float] = DEFAULT_THRESHOLDS,
+    methods: typing.Iterable[str] = METHODS,
+    feature_sets: typing.Mapping[str, typing.Iterable[str]] | None = None,
+) -> list[Candidate]:
+    # Every method, threshold and feature subset, without the ones selecting the same columns
+    # as an earlier candidate and the ones `solve` would refuse (a `drop` candidate keeping
+    # missing values, an `impute` one with a column that is never observed).
+    observed = numpy.diag(moments.count)
+    missing = dict(zip(moments.columns, (moments.rows - observed) / moments.rows))
+    target, features = moments.columns[0], moments.columns[1:]
+    # All features, and the named subsets of them.
+    subsets = {"": set(features)}
+    subsets.update({name: set(subset) for name, subset in (feature_sets or {}).items()})
+    seen = set()
+    candidates = []
+    for subset, names in subsets.items():
+        for method in methods:
+            if method not in METHODS:
+                raise NotImplementedError(f"Unknown method: '{method}'")
+            for threshold in sorted(thresholds):
+                kept = [name for name in features if name in names]
+                columns = (target, *[name for name in kept if not missing[name] > threshold])
+                if method == "impute":
+                    usable = all(missing[name] < 1.0 for name in columns)
+                else:
+                    usable = all(missing[name] == 0.0 for name in columns)
+                if len(columns) < 2 or not usable:
+                    continue
+                key = (method == "impute", columns)
+                if key in seen:
+                    continue
+                seen.add(key)
+                candidates.append(Candidate(method, float(threshold), columns, subset))
+    return candidates
+
+
+def evaluate(moments: Moments, candidates: list[Candidate]) -> tuple[numpy.ndarray, numpy.ndarray]:
+    # R² and adjusted R² of all candidates from one covariance matrix of all columns with
+    # their missing values imputed. Blocks of complete columns do not depend on the imputation,
+    # so `drop` candidates are solved from the same matrix. Candidates with the same number of
+    # columns are stacked and solved at once.
+    everything = numpy.arange(len(moments.columns))
+    covariance = filled_moments(moments, everything, impute=True)[1]
+    positions = {name: i for i, name in enumerate(moments.columns)}
+    groups: dict[int, list[int]] = {}
+    for i, candidate in enumerate(candidates):
+        groups.setdefault(len(candidate.columns), []).append(i)
+    r2 = numpy.empty(len(candidates))
+    r2_adj = numpy.empty(len(candidates))
+    for size, members in groups.items():
+        index = numpy.array(
+            [[positions[name] for name in candidates[i].columns] for i in members],
+            dtype=numpy.intp,
+        )
+        blocks = covariance[index[:, :, numpy.newaxis], index[:, numpy.newaxis, :]]
+        xx, xy, yy = blocks[:, 1:, 1:], blocks[:, 1:, 0], blocks[:, 0, 0]
+        try:
+            coefficients = numpy.linalg.solve(xx, xy[:, :, numpy.newaxis])[:, :, 0]
+        except numpy.linalg.LinAlgError:
+            # Singular blocks (collinear columns) get the minimum norm solution like `solve`.
+            coefficients = numpy.stack(
+                [numpy.linalg.lstsq(a, b, rcond=None)[0] for a, b in zip(xx, xy)]
+            )
+        residual = (
+            yy
+            - 2 * numpy.einsum("kp,kp->k", coefficients, xy)
+            + numpy.einsum("kp,kpq,kq->k", coefficients, xx, coefficients)
+        )
+        total = numpy.where(yy > 0, yy, 1.0)
+        constant = numpy.where(numpy.isclose(residual, 0.0), 1.0, 0.0)
+        scores = numpy.where(yy > 0, 1 - residual / total, constant)
+        r2[members] = scores
+        features = size - 1
+        r2_adj[members] = 1 - (1 - scores) * (moments.rows - 1) / (moments.rows - features - 1)
+    return (r2, r2_adj)
+
+
+def sweep(
+    moments: Moments,
+    thresholds: typing.Iterable[float] = DEFAULT_THRESHOLDS,
+    methods: typing.Iterable[str] = METHODS,
+    feature_sets: typing.Mapping[str, typing.Iterable[str]] | None = None,
+) -> list[SweepResult]:
+    # All candidates scored without reading the data, best adjusted R² first.
+    candidates = sweep_candidates(moments, thresholds, methods, feature_sets)
+    if len(candidates) == 0:
+        raise ValueError("No cleaning strategy to evaluate")
+    r2, r2_adj = evaluate(moments, candidates)
+    order = numpy.argsort(-r2_adj, kind="stable")
+    return [SweepResult(candidates[i], float(r2[i]), float(r2_adj[i])) for i in order]
+
+
+def select_winners(results: list[SweepResult], winners: int) -> list[SweepResult]:
+    # The `winners` best results, for pipelines declaring an output for each of them.
+    if len(results) < winners:
+        raise ValueError(
+            f"{winners} winners requested but only {len(results)} cleaning strategies to"
+            f" evaluate: {', '.join(result.candidate.name for result in results)}"
+        )
+    return results[:winners]
+
+
+def fit_candidate(moments: Moments, candidate: Candidate) -> LinearFit:
+    # The same fit as `fit_linear_model` for the columns of the candidate.
+    return solve(moments, list(candidate.columns), candidate.impute)
+
+
+def read_candidate(
+    source: "SourceType",
+    statistics: "Statistics",
+    candidate: Candidate,
+) -> "pandas.DataFrame":
+    # The columns of the candidate, imputed with the precomputed means like `read_imputed`.
+    from .arrow import read_frame
+    from .statistics import column_means
+
+    data = read_frame(source, columns=list(candidate.columns))
+    if candidate.impute:
+        data.fillna(column_means(statistics), inplace=True)
+    return data
+
+
+def sweep_report(results: list[SweepResult], rows: int, winners: int) -> SweepReport:
+    return {
+        "rows": rows,
+        "candidates": [
+            {
+                "name": result.candidate.name,
+                "method": result.candidate.method,
+                "threshold": result.candidate.threshold,
+                "features": list(result.candidate.columns[1:]),
+                "r2": result.r2,
+                "r2_adj": result.r2_adj,
+            }
+            for result in results
+        ],
+        "winners": [result.candidate.name for result in results[:winners]],
+    }
+
+
+def save_report(report: SweepReport, path: pathlib.Path) -> None:
+    temp_path = path.with_name(f"{path.name}.tmp")
+    temp_path.write_text(json.dumps(report, indent=2))
+    temp_path.replace(path)
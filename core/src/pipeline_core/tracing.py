@@ -0,0 +1,245 @@
+import contextlib
+import dataclasses
+import json
+import os
+import pathlib
+import socket
+import sys
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    import psutil
+
+# JSONL file the spans are appended to, tracing is disabled if not set.
+TRACE_ENV = "PIPELINE_TRACE"
+
+
+def count_rows(value: typing.Any) -> int | None:
+    # Rows of data frames, tables, Parquet (footer) and Arrow files, summed over collections.
+    if isinstance(value, (list, tuple)):
+        counts = [count_rows(item) for item in value]
+    elif isinstance(value, dict):
+        counts = [count_rows(item) for item in value.values()]
+    elif isinstance(value, (str, pathlib.Path)):
+        path = pathlib.Path(value)
+        if path.suffix not in (".parquet", ".arrow") or not path.is_file():
+            return None
+        if path.suffix == ".arrow":
+            from .arrow import read_arrow
+
+            return read_arrow(path).num_rows  # memory-mapped, only the batch headers are read
+        import pyarrow.parquet
+
+        return pyarrow.parquet.read_metadata(path).num_rows
+    else:
+        # Whatever library the value comes from is already imported.
+        pandas = sys.modules.get("pandas")
+        if pandas is not None and isinstance(value, pandas.DataFrame):
+            return len(value)
+        pyarrow = sys.modules.get("pyarrow")
+        if pyarrow is not None and isinstance(value, (pyarrow.Table, pyarrow.RecordBatch)):
+            return value.num_rows
+        return None
+    known = [count for count in counts if count is not None]
+    return sum(known) if known else None
+
+
+def collect_files(value: typing.Any) -> list[str]:
+    if isinstance(value, (list, tuple)):
+        return [path for item in value for path in collect_files(item)]
+    if isinstance(value, dict):
+        return [path for item in value.values() for path in collect_files(item)]
+    if isinstance(value, pathlib.Path):
+        return [str(value)]
+    return []
+
+
+def io_counters(process: "psutil.Process") -> tuple[int, int]:
+    if not hasattr(process, "io_counters"):  # not available on macOS
+        return (0, 0)
+    io = process.io_counters()
+    # `*_chars` (Linux) count page cache hits too, `*_bytes` only disk I/O.
+    return (getattr(io, "read_chars", io.read_bytes), getattr(io, "write_chars", io.write_bytes))
+
+
+@dataclasses.dataclass
+class Span:
+    name: str
+    attributes: dict[str, typing.Any]
+    inputs: typing.Any = None
+    outputs: typing.Any = None
+    start: float = 0.0
+    start_counter: float = 0.0
+    start_cpu: float = 0.0
+    start_io: tuple[int, int] = (0, 0)
+    peak_rss: int = 0
+
+
+class Tracer:
+    # Spans of tasks with their CPU time, peak RSS and I/O, measured for the whole process:
+    # tasks running concurrently in threads of one process are counted in each other's spans.
+    # Every span is appended to the JSONL file as a single line, so processes can share it.
+
+    def __init__(self, path: pathlib.Path | None, interval: float = 0.05) -> None:
+        self.path = path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pid: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def process(self) -> "psutil.Process":
+        import psutil  # imported only when tracing is enabled
+
+        # A forked process must not use its parent's sampler or active spans.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._process = psutil.Process()
+            self.active: set[int] = set()
+            self.spans: dict[int, Span] = {}
+            self.sampler: threading.Thread | None = None
+        return self._process
+
+    def sample(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            rss = self._process.memory_info().rss
+            with self.lock:
+                if not self.spans:
+                    self.sampler = None
+                    return
+                for span in self.spans.values():
+                    span.peak_rss = max(span.peak_rss, rss)
+
+    def start(self, name: str, inputs: typing.Any = None, **attributes: typing.Any) -> Span:
+        span = Span(name=name, attributes=attributes, inputs=inputs)
+        if not self.enabled:
+            return span
+        process = self.process()
+        with process.oneshot():
+            times = process.cpu_times()
+            span.start_cpu = times.user + times.system
+            span.start_io = io_counters(process)
+            span.peak_rss = process.memory_info().rss
+        span.start = time.time()
+        span.start_counter = time.perf_counter()
+        with self.lock:
+            self.spans[id(span)] = span
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self.sample, daemon=True)
+                self.sampler.start()
+        return span
+
+    def end(self, span: Span, outputs: typing.Any = None, error: str | None = None) -> None:
+        if self.path is None:
+            return
+        duration = time.perf_counter() - span.start_counter
+        process = self.process()
+        with process.oneshot():
+            times = process.cpu_times()
+            read, written = io_counters(process)
+            rss = process.memory_info().rss
+        with self.lock:
+            self.spans.pop(id(span), None)
+        outputs = span.outputs if outputs is None else outputs
+        record = {
+            "name": span.name,
+            **span.attributes,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "start": span.start,
+            "end": span.start + duration,
+            "duration": duration,
+            "cpu_time": times.user + times.system - span.start_cpu,
+            "peak_rss": max(span.peak_rss, rss),
+            "bytes_read": read - span.start_io[0],
+            "bytes_written": written - span.start_io[1],
+            "rows_in": count_rows(span.inputs),
+            "rows_out": count_rows(outputs),
+            "inputs": collect_files(span.inputs),
+            "outputs": collect_files(outputs),
+            "status": "failed" if error else "success",
+            "error": error,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    @contextlib.contextmanager
+    def span(
+        self,
+        name: str,
+        inputs: typing.Any = None,
+        **attributes: typing.Any,
+    ) -> typing.Iterator[Span]:
+        # Outputs are set on the span by the traced code, e.g. `span.outputs = [path]`.
+        span = self.start(name, inputs, **attributes)
+        try:
+            yield span
+        except BaseException as error:
+            self.end(span, error=repr(error))
+            raise
+        self.end(span)
+
+
+def get_tracer() -> Tracer:
+    path = os.environ.get(TRACE_ENV)
+    return Tracer(pathlib.Path(path).resolve() if path else None)
+
+
+TRACER = get_tracer()
+
+
+def read_trace(path: pathlib.Path) -> list[dict[str, typing.Any]]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_chrome_trace(records: list[dict[str, typing.Any]]) -> dict[str, typing.Any]:
+    # Complete events ("X") in microseconds, one process per worker process and host,
+    # viewable in chrome://tracing or https://ui.perfetto.dev.
+    origin = min((record["start"] for record in records), default=0.0)
+    events: list[dict[str, typing.Any]] = []
+    for record in records:
+        args = {
+            key: value
+            for key, value in record.items()
+            if key not in ("name", "start", "end", "duration", "pid", "tid")
+        }
+        events.append(
+            {
+                "name": record["name"],
+                "cat": record.get("framework", "task"),
+                "ph": "X",
+                "ts": (record["start"] - origin) * 1e6,
+                "dur": record["duration"] * 1e6,
+                "pid": record["pid"],
+                "tid": record["tid"],
+                "args": args,
+            }
+        )
+    processes = {(record["pid"], record["host"]) for record in records}
+    for pid, host in sorted(processes):
+        events.append(
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{host} {pid}"}}
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a JSONL trace to Chrome trace format.")
+    parser.add_argument("input", type=pathlib.Path)
+    parser.add_argument("output", type=pathlib.Path)
+    args = parser.parse_args()
+    args.output.write_text(json.dumps(to_chrome_trace(read_trace(args.input))))
+
+
+if __name__ == "__main__":
+    main()
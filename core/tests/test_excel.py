@@ -0,0 +1,48 @@
+import importlib.util
+import logging
+import pathlib
+
+import pytest
+from pipeline_core.excel import read_excel
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def write_workbook(path: pathlib.Path, rows: list[list[object]]) -> None:
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+
+
+def test_convertible_sheet_is_read_without_warning(
+    tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    path = tmp_path / "data.xlsx"
+    write_workbook(path, [["y", "x"], [1.5, 1], [2.5, 2]])
+    with caplog.at_level(logging.WARNING):
+        table = read_excel(path, engine="openpyxl")
+    assert table.column_names == ["y", "x"]
+    assert caplog.records == []
+
+
+def test_fallback_to_pandas_is_logged(
+    tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    path = tmp_path / "data.xlsx"
+    # An unnamed column is refused by the engine's conversion, pandas names it.
+    write_workbook(path, [["y", None], [1.5, 1], [2.5, 2]])
+    with caplog.at_level(logging.WARNING):
+        table = read_excel(path, engine="openpyxl")
+    assert table.column_names == ["y", "Unnamed: 1"]
+    assert "Excel engine 'openpyxl' cannot convert" in caplog.text
+
+
+@pytest.mark.skipif(importlib.util.find_spec("python_calamine") is not None, reason="installed")
+def test_missing_engine_is_logged(tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture) -> None:
+    path = tmp_path / "data.xlsx"
+    write_workbook(path, [["y", "x"], [1.5, 1]])
+    with caplog.at_level(logging.WARNING):
+        table = read_excel(path, engine="calamine")
+    assert table.num_rows == 1
+    assert "Excel engine 'calamine' is not installed" in caplog.text
@@ -0,0 +1,46 @@
+import pathlib
+
+import numpy
+import pandas
+import pyarrow
+import pytest
+from pipeline_core.parquet import write_parquet
+from pipeline_core.regression import compute_moments, fit_linear_model
+
+sklearn_linear_model = pytest.importorskip("sklearn.linear_model")
+
+
+def offset_data(rows: int = 20_000, offset: float = 1e6) -> pandas.DataFrame:
+    # Columns far from zero, where sums of squares without centring lose precision.
+    rng = numpy.random.default_rng(0)
+    features = rng.normal(loc=offset, scale=1.0, size=(rows, 3))
+    target = features @ numpy.array([2.0, -1.0, 0.5]) + rng.normal(scale=0.1, size=rows)
+    data = pandas.DataFrame(features, columns=["x0", "x1", "x2"])
+    data.insert(0, "y", target)
+    data.loc[rng.random(rows) < 0.3, "x2"] = numpy.nan
+    return data
+
+
+def fit_sklearn(data: pandas.DataFrame) -> tuple[numpy.ndarray, float]:
+    model = sklearn_linear_model.LinearRegression()
+    model.fit(data.iloc[:, 1:], data.iloc[:, 0])
+    return (model.coef_, float(model.intercept_))
+
+
+@pytest.mark.parametrize("method", ["drop", "impute"])
+def test_fit_matches_sklearn_with_large_offset(tmp_path: pathlib.Path, method: str) -> None:
+    data = offset_data()
+    path = tmp_path / "data.parquet"
+    # Small batches, the moments are summed over several of them.
+    write_parquet(pyarrow.Table.from_pandas(data, preserve_index=False), path)
+    moments = compute_moments(path, memory_limit=2**16)
+    assert numpy.allclose(moments.shift, data.mean(), rtol=1e-3)
+    fit = fit_linear_model(moments, method, threshold=0.2)
+    if method == "drop":
+        expected = data.drop(columns=["x2"])
+    else:
+        expected = data.fillna(data.mean())
+    coefficients, intercept = fit_sklearn(expected)
+    assert fit.features == list(expected.columns[1:])
+    numpy.testing.assert_allclose(fit.coefficients, coefficients, rtol=1e-6)
+    numpy.testing.assert_allclose(fit.intercept, intercept, rtol=1e-6)
@@ -0,0 +1,44 @@
+import pathlib
+
+import numpy
+import pandas
+import pyarrow
+import pytest
+from pipeline_core.parquet import write_parquet
+from pipeline_core.statistics import compute_statistics, read_dropped, read_imputed
+
+
+@pytest.fixture
+def data() -> pandas.DataFrame:
+    rng = numpy.random.default_rng(0)
+    data = pandas.DataFrame(rng.normal(size=(1_000, 4)), columns=["y", "x0", "x1", "x2"])
+    data.loc[rng.random(1_000) < 0.1, "x1"] = numpy.nan
+    data.loc[rng.random(1_000) < 0.5, "x2"] = numpy.nan
+    data["color"] = rng.choice(["red", "blue"], size=1_000)
+    return data
+
+
+@pytest.fixture
+def path(tmp_path: pathlib.Path, data: pandas.DataFrame) -> pathlib.Path:
+    path = tmp_path / "data.parquet"
+    write_parquet(pyarrow.Table.from_pandas(data, preserve_index=False), path)
+    return path
+
+
+# The helpers copied into the pipelines before pipeline_core, the cleaning must not change.
+def test_statistics_match_pandas(data: pandas.DataFrame, path: pathlib.Path) -> None:
+    statistics = compute_statistics(path)
+    assert statistics["num_rows"] == len(data)
+    for name, column in statistics["columns"].items():
+        assert column["null_count"] == data[name].isna().sum()
+
+
+def test_read_dropped_matches_pandas(data: pandas.DataFrame, path: pathlib.Path) -> None:
+    mask = data.isna().sum(axis="index") / data.shape[0] > 0.2
+    expected = data.drop(columns=data.columns[mask])
+    pandas.testing.assert_frame_equal(read_dropped(path, compute_statistics(path), 0.2), expected)
+
+
+def test_read_imputed_matches_pandas(data: pandas.DataFrame, path: pathlib.Path) -> None:
+    expected = data.fillna(data.mean(numeric_only=True))
+    pandas.testing.assert_frame_equal(read_imputed(path, compute_statistics(path)), expected)
@@ -0,0 +1,22 @@
+import pathlib
+
+import numpy
+import pandas
+import pyarrow
+import pytest
+from pipeline_core.parquet import write_parquet
+from pipeline_core.regression import compute_moments
+from pipeline_core.sweep import select_winners, sweep
+
+
+def test_select_winners_with_more_winners_than_candidates(tmp_path: pathlib.Path) -> None:
+    rng = numpy.random.default_rng(0)
+    data = pandas.DataFrame(rng.normal(size=(100, 3)), columns=["y", "x0", "x1"])
+    path = tmp_path / "data.parquet"
+    write_parquet(pyarrow.Table.from_pandas(data, preserve_index=False), path)
+    # Complete columns, every threshold selects the same columns: one drop, one impute.
+    results = sweep(compute_moments(path), thresholds=[0.0, 0.5])
+    assert len(results) == 2
+    assert select_winners(results, 2) == results
+    with pytest.raises(ValueError, match="3 winners requested but only 2"):
+        select_winners(results, 3)
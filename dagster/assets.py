@@ -1,125 +1,368 @@
+import concurrent.futures
+import functools
+import os
 import pathlib
-import pickle
+import typing
 
 import pandas
-import sklearn.linear_model
-import sklearn.metrics
+import pyarrow
+from pipeline_core.arrow import read_arrow, write_arrow
+from pipeline_core.concat import concat_reader
+from pipeline_core.excel import read_excel
+from pipeline_core.footprint import Footprint, format_report, optimize_reader, optimize_table
+from pipeline_core.model import LinearModel, predict_parquet
+from pipeline_core.parquet import open_parquet, read_parquet, write_parquet
+from pipeline_core.regression import compute_moments, fit_linear_model, load_moments
+from pipeline_core.statistics import (
+    compute_statistics,
+    footer_statistics,
+    load_statistics,
+    read_dropped,
+    read_imputed,
+    save_statistics,
+)
+from pipeline_core.sweep import (
+    DEFAULT_THRESHOLDS,
+    fit_candidate,
+    read_candidate,
+    save_report,
+    sweep,
+    sweep_report,
+)
+from pipeline_core.tracing import TRACER
 
 import dagster
+from io_managers import ContentAddressedIOManager, early_cutoff, file_digest
 
 ROOT = pathlib.Path(__file__).parent
 
 
-def dataframe_to_metadata(
-    data: pandas.DataFrame,
+def table_metadata(
+    schema: pyarrow.Schema,
+    num_rows: int,
+    statistics: pandas.DataFrame,
+    preview: pyarrow.Table | pyarrow.RecordBatch,
 ) -> dict[str, dagster.TableSchema | dagster.MetadataValue]:
-    schema = dagster.TableSchema(
-        [
-            dagster.TableColumn(name, column_type.name)
-            for name, column_type in zip(data.columns, data.dtypes)
-        ]
+    fields = [field for field in schema if not field.name.startswith("__index_level_")]
+    table_schema = dagster.TableSchema(
+        [dagster.TableColumn(field.name, str(field.type)) for field in fields]
     )
     return {
-        "dagster/column_schema": schema,
-        "dagster/row_count": dagster.IntMetadataValue(data.shape[0]),
-        "dagster/column_count": dagster.IntMetadataValue(data.shape[1]),
-        "preview": dagster.MarkdownMetadataValue(data.head().to_markdown()),
+        "dagster/column_schema": table_schema,
+        "dagster/row_count": dagster.IntMetadataValue(num_rows),
+        "dagster/column_count": dagster.IntMetadataValue(len(fields)),
+        "statistics": dagster.MarkdownMetadataValue(statistics.to_markdown()),
+        "preview": dagster.MarkdownMetadataValue(preview.to_pandas().to_markdown()),
     }
 
 
-def load_excels_from_dir(directory: pathlib.Path) -> list[pandas.DataFrame]:
-    excel_files = list(directory.glob("*.xlsx"))
-    dataframes = [pandas.read_excel(file) for file in excel_files]
-    return dataframes
+def parquet_to_metadata(
+    path: pathlib.Path,
+    preview_rows: int = 5,
+) -> dict[str, dagster.TableSchema | dagster.MetadataValue]:
+    # Only the footer and the first rows of the first row group are read, whatever the file size.
+    file = open_parquet(path)
+    columns = [name for name in file.schema_arrow.names if not name.startswith("__index_level_")]
+    preview = file.schema_arrow.empty_table().select(columns)
+    if file.num_row_groups > 0:
+        batches = file.iter_batches(batch_size=preview_rows, row_groups=[0], columns=columns)
+        preview = next(batches, preview)
+    statistics = footer_statistics(file.metadata)
+    return table_metadata(file.schema_arrow, file.metadata.num_rows, statistics, preview)
+
+
+def arrow_to_metadata(
+    path: pathlib.Path,
+    preview_rows: int = 5,
+) -> dict[str, dagster.TableSchema | dagster.MetadataValue]:
+    # Memory-mapped: the null counts are stored in the batch headers, only the previewed rows
+    # are paged in.
+    table = read_arrow(path)
+    columns = [name for name in table.schema.names if not name.startswith("__index_level_")]
+    statistics = pandas.DataFrame(
+        {"null_count": [table.column(name).null_count for name in columns]}, index=columns
+    )
+    preview = table.select(columns).slice(0, preview_rows)
+    return table_metadata(table.schema, table.num_rows, statistics, preview)
+
+
+def traced(function: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+    # Span of an asset's body, the upstream paths and tables are its inputs and the returned paths its outputs.
+    @functools.wraps(function)
+    def wrapper(context: dagster.AssetExecutionContext, *args: typing.Any, **kwargs: typing.Any):
+        inputs = [
+            value
+            for value in kwargs.values()
+            if isinstance(value, (pathlib.Path, list, pyarrow.Table, pandas.DataFrame))
+        ]
+        name = context.asset_key.to_user_string()
+        partitioned = context.assets_def.partitions_def is not None
+        partition = context.partition_key if partitioned else None
+        with TRACER.span(
+            name, inputs, framework="dagster", run_id=context.run_id, partition=partition
+        ) as span:
+            span.outputs = function(context, *args, **kwargs)
+        return span.outputs
+
+    return wrapper
+
+
+def excel_to_parquet(input_path: pathlib.Path, output_path: pathlib.Path) -> pathlib.Path:
+    # Written atomically, so an interrupted run never leaves a broken cache entry.
+    write_parquet(read_excel(input_path), output_path)
+    return output_path
+
+
+def convert_excels_from_dir(
+    directory: pathlib.Path,
+    cache_dir: pathlib.Path,
+    max_workers: int | None = None,
+) -> tuple[list[pathlib.Path], int]:
+    # Every Excel file is cached as a Parquet file named by the hash of its content,
+    # only new or changed files are parsed, in parallel processes if there is more of them.
+    excel_files = sorted(directory.glob("*.xlsx"))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    parquet_paths = {
+        file: cache_dir / f"{file.stem}.{file_digest(file)}.parquet" for file in excel_files
+    }
+    missing = [(file, path) for file, path in parquet_paths.items() if not path.exists()]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(missing))
+    if max_workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(excel_to_parquet, *zip(*missing)))
+    else:
+        for file, path in missing:
+            excel_to_parquet(file, path)
+    for path in cache_dir.glob("*.parquet"):
+        if path not in parquet_paths.values():
+            path.unlink()
+    return (list(parquet_paths.values()), len(missing))
+
+
+class ConcatDataConfig(dagster.Config):
+    max_workers: int | None = None  # processes converting Excel files, defaults to CPU count
+    streaming: bool = False  # write batch by batch, memory is bounded by `memory_limit_mb`
+    memory_limit_mb: int = 256
+    # Smallest types holding the values, floats as float32 within `tolerance` relative error.
+    optimize: bool = False
+    tolerance: float = 0.0
 
 
 @dagster.asset(
     code_version="v1",
     description="Concatenated Excel files from the raw data directory.",
 )
-def concat_data(context: dagster.AssetExecutionContext) -> pathlib.Path:
-    dataframes = load_excels_from_dir(ROOT / "data" / "raw")
-    output_path = ROOT / "data" / "interim" / "concat.parquet"
-    concat = pandas.concat(dataframes).reset_index(drop=True)
-    context.add_output_metadata(dataframe_to_metadata(concat))
-    concat.to_parquet(output_path)
+@traced
+def concat_data(context: dagster.AssetExecutionContext, config: ConcatDataConfig) -> pathlib.Path:
+    parquet_paths, converted = convert_excels_from_dir(
+        ROOT / "data" / "raw",
+        cache_dir=ROOT / "data" / "interim" / "excel",
+        max_workers=config.max_workers,
+    )
+    context.log.info(f"Converted {converted} of {len(parquet_paths)} Excel files")
+    # Uncompressed Arrow IPC, memory-mapped by the downstream assets instead of decoded.
+    output_path = ROOT / "data" / "interim" / "concat.arrow"
+    footprint = Footprint(tolerance=config.tolerance)
+    report = None
+    if config.streaming:
+        open_reader = functools.partial(
+            concat_reader, parquet_paths, config.memory_limit_mb * 2**20
+        )
+        if config.optimize:
+            reader, report = optimize_reader(open_reader, footprint)
+        else:
+            reader = open_reader()
+        write_arrow(reader, output_path)
+    else:
+        dataframes = [read_parquet(path) for path in parquet_paths]
+        concat = pandas.concat(dataframes).reset_index(drop=True)
+        if config.optimize:
+            concat, report = optimize_table(concat, footprint)
+        write_arrow(concat, output_path)
+    if report is not None:
+        context.log.info(format_report(report))
+        context.add_output_metadata(
+            {
+                "bytes_before": dagster.IntMetadataValue(report["bytes_before"]),
+                "bytes_after": dagster.IntMetadataValue(report["bytes_after"]),
+            }
+        )
+    context.add_output_metadata(arrow_to_metadata(output_path))
     return output_path
 
 
-def drop_columns_with_missing_values(data: pandas.DataFrame, threshold: float) -> pandas.DataFrame:
-    column_mask = (data.isna().sum(axis="index") / data.shape[0]) > threshold
-    data = data.drop(columns=data.columns[column_mask])
-    if data.shape[1] == 0:
-        raise ValueError("No columns left after dropping")
-    return data
-
-
-def impute_columns_with_mean(data: pandas.DataFrame) -> pandas.DataFrame:
-    data = data.fillna(data.mean(numeric_only=True))
-    return data
+@dagster.asset(
+    code_version="v1",
+    description="Null counts, non-null counts and sums of the concatenated data's columns.",
+)
+@traced
+@early_cutoff
+def column_statistics(
+    context: dagster.AssetExecutionContext,
+    concat_data: pyarrow.Table,
+) -> pathlib.Path:
+    statistics = compute_statistics(concat_data)
+    output_path = ROOT / "data" / "interim" / "concat_statistics.json"
+    save_statistics(statistics, output_path)
+    context.add_output_metadata({"dagster/row_count": statistics["num_rows"]})
+    return output_path
 
 
 clean_partition = dagster.StaticPartitionsDefinition(["drop", "impute"])
 
 
 @dagster.asset(
-    code_version="v1",
+    code_version="v2",
     partitions_def=clean_partition,  # ["drop", "impute"]
     description="Concatenated data with columns with missing values removed or imputed.",
 )
+@traced
+@early_cutoff
 def clean_data(
     context: dagster.AssetExecutionContext,
-    concat_data: pathlib.Path,
+    concat_data: pyarrow.Table,
+    column_statistics: pathlib.Path,
 ) -> pathlib.Path:
     method = context.partition_key  # current partition
-    concat = pandas.read_parquet(concat_data)
+    statistics = load_statistics(column_statistics)
     if method == "drop":
-        clean = drop_columns_with_missing_values(concat, threshold=0.2)
+        clean = read_dropped(concat_data, statistics, threshold=0.2)
     elif method == "impute":
-        clean = impute_columns_with_mean(concat)
+        clean = read_imputed(concat_data, statistics)
     else:
         raise NotImplementedError(f"Unknown partition key: '{method}'")
     output_path = ROOT / "data" / "processed" / f"clean_{method}.parquet"
-    context.add_output_metadata(dataframe_to_metadata(clean))
-    clean.to_parquet(output_path)
+    write_parquet(clean, output_path)
+    context.add_output_metadata(parquet_to_metadata(output_path))
     return output_path
 
 
-def adjusted_r2_score(r2: float, n: int, p: int) -> float:
-    return 1 - (1 - r2) * (n - 1) / (n - p - 1)
-
-
-def fit_linear_model(
-    X: pandas.DataFrame, y: pandas.DataFrame
-) -> tuple[sklearn.linear_model.LinearRegression, float]:
-    model = sklearn.linear_model.LinearRegression()
-    model.fit(X, y)
-    r2 = sklearn.metrics.r2_score(y, model.predict(X))
-    r2_adj = adjusted_r2_score(r2=r2, n=X.shape[0], p=X.shape[1])
-    return (model, r2_adj)
+@dagster.asset(
+    code_version="v1",
+    deps=[concat_data],
+    description="Sufficient statistics for the linear regression of every cached Excel file.",
+)
+@traced
+def moments(context: dagster.AssetExecutionContext) -> list[pathlib.Path]:
+    # Named like the Parquet cache (by the hash of the Excel file), so only new or changed
+    # files are read and the regression never reads the whole dataset.
+    output_dir = ROOT / "data" / "interim" / "moments"
+    output_dir.mkdir(exist_ok=True)
+    output_paths = []
+    computed = 0
+    for path in sorted((ROOT / "data" / "interim" / "excel").glob("*.parquet")):
+        output_path = output_dir / f"{path.stem}.npz"
+        if not output_path.exists():
+            compute_moments(path).save(output_path)
+            computed += 1
+        output_paths.append(output_path)
+    for path in output_dir.glob("*.npz"):
+        if path not in output_paths:
+            path.unlink()
+    context.log.info(f"Computed moments of {computed} of {len(output_paths)} files")
+    return output_paths
 
 
 @dagster.asset(
-    code_version="v1",
+    code_version="v2",
     partitions_def=clean_partition,  # ["drop", "impute"]
     description="Linear regression model fitted to the clean dataset.",
 )
+@traced
+@early_cutoff
 def linear_regression(
     context: dagster.AssetExecutionContext,
-    clean_data: pathlib.Path,
+    moments: list[pathlib.Path],
 ) -> pathlib.Path:
     method = context.partition_key
-    data = pandas.read_parquet(clean_data)
-    model, r2_adj = fit_linear_model(
-        X=data.drop(columns=data.columns[0]),
-        y=data.drop(columns=data.columns[1:]),
+    fit = fit_linear_model(load_moments(moments), method, threshold=0.2)
+    context.add_output_metadata({"R2": dagster.FloatMetadataValue(fit.r2_adj)})
+    output_path = ROOT / "models" / f"linear_regression_{method}.npz"
+    fit.to_model().save(output_path)
+    return output_path
+
+
+class CleaningSweepConfig(dagster.Config):
+    thresholds: list[float] = DEFAULT_THRESHOLDS  # drop/impute thresholds evaluated
+    winners: int = 2  # best candidates (by adjusted R²) written as clean data and models
+    feature_sets: dict[str, list[str]] = {}  # named feature subsets, besides all features
+
+
+@dagster.asset(
+    code_version="v1",
+    group_name="sweep",
+    description="Drop/impute thresholds solved from the moments, the best ones materialized.",
+)
+@traced
+@early_cutoff
+def cleaning_sweep(
+    context: dagster.AssetExecutionContext,
+    config: CleaningSweepConfig,
+    moments: list[pathlib.Path],
+    concat_data: pyarrow.Table,
+    column_statistics: pathlib.Path,
+) -> list[pathlib.Path]:
+    merged = load_moments(moments)
+    results = sweep(merged, config.thresholds, feature_sets=config.feature_sets or None)
+    report = sweep_report(results, merged.rows, config.winners)
+    statistics = load_statistics(column_statistics)
+    clean_dir = ROOT / "data" / "processed" / "sweep"
+    model_dir = ROOT / "models" / "sweep"
+    clean_dir.mkdir(exist_ok=True)
+    model_dir.mkdir(exist_ok=True)
+    output_paths = []
+    for rank, result in enumerate(results[: config.winners], start=1):
+        clean_path = clean_dir / f"clean_{rank}.parquet"
+        model_path = model_dir / f"linear_regression_{rank}.npz"
+        write_parquet(read_candidate(concat_data, statistics, result.candidate), clean_path)
+        fit_candidate(merged, result.candidate).to_model().save(model_path)
+        output_paths += [clean_path, model_path]
+    report_path = clean_dir / "report.json"
+    save_report(report, report_path)
+    context.add_output_metadata(
+        {
+            "candidates": dagster.IntMetadataValue(len(report["candidates"])),
+            "winners": dagster.TextMetadataValue(", ".join(report["winners"])),
+            "R2": dagster.FloatMetadataValue(results[0].r2_adj),
+        }
     )
-    context.add_output_metadata({"R2": dagster.FloatMetadataValue(r2_adj)})
-    output_path = ROOT / "models" / f"linear_regression_{method}.pkl"
-    output_path.write_bytes(pickle.dumps(model))
+    return [report_path, *output_paths]
+
+
+class PredictionConfig(dagster.Config):
+    chunk_rows: int = 65536  # rows scored at once, memory is bounded by the chunk
+
+
+@dagster.asset(
+    code_version="v1",
+    partitions_def=clean_partition,  # ["drop", "impute"]
+    description="Concatenated data scored by the linear regression model.",
+)
+@traced
+@early_cutoff
+def prediction(
+    context: dagster.AssetExecutionContext,
+    config: PredictionConfig,
+    linear_regression: pathlib.Path,
+    concat_data: pyarrow.Table,
+) -> pathlib.Path:
+    method = context.partition_key
+    output_path = ROOT / "data" / "processed" / f"prediction_{method}.parquet"
+    model = LinearModel.load(linear_regression)
+    predict_parquet(model, concat_data, output_path, chunk_rows=config.chunk_rows)
+    context.add_output_metadata(parquet_to_metadata(output_path))
     return output_path
 
 
 definitions = dagster.Definitions(
-    assets=[concat_data, clean_data, linear_regression],
+    assets=[
+        concat_data,
+        column_statistics,
+        clean_data,
+        moments,
+        linear_regression,
+        prediction,
+        cleaning_sweep,
+    ],
+    resources={"io_manager": ContentAddressedIOManager()},
 )
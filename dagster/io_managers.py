@@ -0,0 +1,245 @@
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import typing
+
+import pandas
+import pyarrow
+from pipeline_core.arrow import read_arrow, read_frame
+
+import dagster
+
+
+def file_digest(path: pathlib.Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()[:32]
+
+
+def combine_digests(digests: typing.Sequence[str]) -> str:
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.blake2b("".join(digests).encode(), digest_size=16).hexdigest()
+
+
+def content_directory(instance: dagster.DagsterInstance) -> pathlib.Path:
+    return pathlib.Path(instance.storage_directory()) / "content"
+
+
+def name_digest(name: str) -> str:
+    return name.split(".", 1)[0]
+
+
+class ContentAddressedIOManager(dagster.ConfigurableIOManager):
+    # Outputs are paths (or lists of paths) of files the assets wrote. Each file is stored under
+    # the hash of its content in `<DAGSTER_HOME>/storage/content`, hard linked when possible,
+    # so identical outputs are stored once and downstream assets load files that are never
+    # overwritten.
+    # The hash is reported as the data version: a re-materialization producing the same bytes
+    # does not make downstream assets stale. Files must be replaced, not rewritten in place,
+    # which all `pipeline_core` writers do.
+    # Arrow IPC files are loaded by the type of the downstream input: a `pyarrow.Table` is
+    # memory-mapped without copying, a `pandas.DataFrame` is converted from it, anything else
+    # gets the path. Partitions loading the same file share its pages in the OS page cache.
+    # The columns of a table or data frame can be projected with `AssetIn(metadata={"columns":
+    # [...]})`.
+    # Stored files no longer referenced by the latest output of any asset partition are deleted
+    # when an output replaces them.
+
+    def store(self, path: pathlib.Path, directory: pathlib.Path) -> str:
+        if path.parent == directory:  # reused by `early_cutoff`, already checked
+            return path.name
+        digest = file_digest(path)
+        name = f"{digest}{path.suffix}"
+        target = directory / name
+        # Linked again even if the content is already stored: a file linked before may have
+        # been overwritten in place since.
+        temp_path = target.with_name(f"{name}.{os.getpid()}.tmp")
+        try:
+            os.link(path, temp_path)
+        except OSError:  # another file system or no hard links, copies are never overwritten
+            if target.exists():
+                return name
+            shutil.copyfile(path, temp_path)
+        temp_path.replace(target)
+        # Renaming a link onto another link of the same file does nothing.
+        temp_path.unlink(missing_ok=True)
+        return name
+
+    def handle_output(
+        self,
+        context: dagster.OutputContext,
+        obj: pathlib.Path | list[pathlib.Path],
+    ) -> None:
+        paths = obj if isinstance(obj, list) else [obj]
+        directory = content_directory(context.step_context.instance)
+        directory.mkdir(parents=True, exist_ok=True)
+        names = [self.store(path, directory) for path in paths]
+        data_version = combine_digests([name_digest(name) for name in names])
+        inputs = context.output_metadata.get("inputs")  # set by `early_cutoff`
+        partition = context.asset_partition_key if context.has_asset_partitions else None
+        reference_file = reference_path(directory, context.asset_key, partition)
+        previous = read_reference(reference_file)
+        written = [str(path) for path in paths]
+        if previous is not None and all(path.parent == directory for path in paths):
+            written = previous["paths"]  # reused by `early_cutoff`, the asset wrote nothing
+        reference = {
+            "files": names,
+            "paths": written,
+            "list": isinstance(obj, list),
+            "data_version": data_version,
+            "inputs": inputs.value if inputs is not None else None,
+        }
+        write_reference(reference_file, reference)
+        # Another process may have collected a file between storing it and the reference.
+        for path, name in zip(paths, names):
+            if not (directory / name).exists():
+                self.store(path, directory)
+        if previous is not None:
+            collect_garbage(directory, set(previous["files"]) - set(names))
+        context.step_context.set_data_version(context.asset_key, dagster.DataVersion(data_version))
+        context.add_output_metadata({"data_version": data_version})
+
+    def load_input(self, context: dagster.InputContext) -> typing.Any:
+        directory = content_directory(context.instance)
+        partition = context.asset_partition_key if context.has_asset_partitions else None
+        reference = read_reference(reference_path(directory, context.asset_key, partition))
+        if reference is None:
+            raise FileNotFoundError(f"No stored output of {context.asset_key.to_user_string()}")
+        paths = [directory / name for name in reference["files"]]
+        if not reference["list"] and paths[0].suffix == ".arrow":
+            columns = (context.definition_metadata or {}).get("columns")
+            if context.dagster_type.typing_type is pyarrow.Table:
+                table = read_arrow(paths[0])
+                return table.select(columns) if columns is not None else table
+            if context.dagster_type.typing_type is pandas.DataFrame:
+                return read_frame(read_arrow(paths[0]), columns)
+        return paths if reference["list"] else paths[0]
+
+
+def reference_path(
+    directory: pathlib.Path,
+    asset_key: dagster.AssetKey,
+    partition: str | None,
+) -> pathlib.Path:
+    # Latest stored output of an asset partition.
+    name = asset_key.to_python_identifier()
+    return directory / "refs" / name / f"{partition or '__all__'}.json"
+
+
+def read_reference(path: pathlib.Path) -> dict[str, typing.Any] | None:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def write_reference(path: pathlib.Path, reference: dict[str, typing.Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps(reference, indent=2))
+    temp_path.replace(path)
+
+
+def collect_garbage(directory: pathlib.Path, names: typing.Iterable[str] | None = None) -> int:
+    # Deletes the stored files `names` that no reference points to, by default all of them and
+    # the temporary files of interrupted runs. Returns the number of files deleted.
+    referenced = set()
+    for path in (directory / "refs").glob("*/*.json"):
+        reference = read_reference(path)
+        if reference is not None:
+            referenced.update(reference["files"])
+    if names is None:
+        names = [path.name for path in directory.iterdir() if path.is_file()]
+    deleted = 0
+    for name in names:
+        path = directory / name
+        if name in referenced:
+            continue
+        try:
+            path.unlink()
+            deleted += 1
+        except FileNotFoundError:
+            pass
+    return deleted
+
+
+def partition_key(context: dagster.AssetExecutionContext) -> str | None:
+    return context.partition_key if context.assets_def.partitions_def else None
+
+
+def input_data_version(context: dagster.AssetExecutionContext, name: str) -> str:
+    # Data version of the upstream partition loaded as input `name`.
+    asset_key = context.asset_key_for_input(name)
+    partition = None
+    if context.job_def.asset_layer.asset_graph.get(asset_key).partitions_def is not None:
+        partition = context.asset_partition_key_for_input(name)
+    directory = content_directory(context.instance)
+    reference = read_reference(reference_path(directory, asset_key, partition))
+    return reference["data_version"] if reference is not None else ""
+
+
+def inputs_key(context: dagster.AssetExecutionContext, inputs: dict[str, typing.Any]) -> str:
+    # Code version, partition, config and the data versions of the upstream assets.
+    upstream = context.assets_def.keys_by_input_name
+    parts = [
+        context.assets_def.code_versions_by_key.get(context.asset_key) or "",
+        partition_key(context) or "",
+    ]
+    for name, value in sorted(inputs.items()):
+        if name in upstream:
+            parts.append(input_data_version(context, name))
+        elif isinstance(value, dagster.Config):
+            parts.append(value.model_dump_json())
+        else:
+            parts.append(repr(value))
+        parts.append(name)
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def unchanged_file(path: pathlib.Path, name: str) -> bool:
+    # The file the asset wrote still exists and holds the stored content, it was not deleted or
+    # overwritten since.
+    try:
+        return file_digest(path) == name_digest(name)
+    except FileNotFoundError:
+        return False
+
+
+def early_cutoff(function: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+    # An asset partition whose code version, config and inputs did not change since its last
+    # materialization is not computed again, its previous output is reused and only hashed.
+    # Must be applied to assets stored by `ContentAddressedIOManager` (the default IO manager).
+    @functools.wraps(function)
+    def wrapper(context: dagster.AssetExecutionContext, *args: typing.Any, **kwargs: typing.Any):
+        key = inputs_key(context, kwargs)
+        directory = content_directory(context.instance)
+        partition = partition_key(context)
+        reference = read_reference(reference_path(directory, context.asset_key, partition))
+        if (
+            reference is not None
+            and reference["inputs"] == key
+            and all(
+                unchanged_file(pathlib.Path(path), name)
+                for path, name in zip(reference["paths"], reference["files"])
+            )
+        ):
+            context.log.info("Inputs unchanged since the last materialization, output reused")
+            # The stored files, which are never modified.
+            paths = [directory / name for name in reference["files"]]
+            value = paths if reference["list"] else paths[0]
+        else:
+            value = function(context, *args, **kwargs)
+        context.add_output_metadata({"inputs": key})
+        return value
+
+    return wrapper
+
+
+if __name__ == "__main__":
+    # Deletes every stored file no reference points to, e.g. left by an interrupted run.
+    # Must not run while assets are materialized, their temporary files would be deleted.
+    content = content_directory(dagster.DagsterInstance.get())
+    print(f"Deleted {collect_garbage(content)} unreferenced files from '{content}'")
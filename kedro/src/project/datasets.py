@@ -0,0 +1,192 @@
+import hashlib
+import pathlib
+import typing
+
+import pandas
+import pyarrow
+from kedro.io import AbstractDataset, DatasetError
+from kedro_datasets.partitions import PartitionedDataset
+from pipeline_core.arrow import SHARED_DIR, read_arrow, write_arrow
+from pipeline_core.excel import read_excel
+from pipeline_core.model import LinearModel
+from pipeline_core.parquet import read_parquet, write_batches, write_parquet
+from pipeline_core.regression import Moments
+
+StreamType = typing.Callable[[], pyarrow.RecordBatchReader]
+
+
+class ExcelDataset(AbstractDataset[None, pyarrow.Table]):
+    # Read-only Excel file loaded as an Arrow table by `pipeline_core.excel`.
+    # `engine` is auto, calamine, openpyxl or pandas, `dtypes` maps columns to Arrow types.
+
+    def __init__(
+        self,
+        filepath: str,
+        engine: str | None = None,
+        dtypes: dict[str, str] | None = None,
+        metadata: dict[str, typing.Any] | None = None,
+    ) -> None:
+        self._filepath = pathlib.Path(filepath)
+        self._engine = engine
+        self._dtypes = dtypes
+        self.metadata = metadata
+
+    def load(self) -> pyarrow.Table:
+        return read_excel(self._filepath, self._engine, self._dtypes)
+
+    def save(self, data: None) -> None:
+        raise DatasetError(f"{type(self).__name__} is read-only")
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
+
+    def _describe(self) -> dict[str, typing.Any]:
+        return {"filepath": self._filepath, "engine": self._engine, "dtypes": self._dtypes}
+
+
+class ParquetDataset(
+    AbstractDataset[pandas.DataFrame | pyarrow.Table | StreamType, pandas.DataFrame | pathlib.Path]
+):
+    # Local Parquet file, which can be also saved lazily from a stream of record batches
+    # (a node returning an iterator would be treated as a generator node by Kedro).
+    # A lazy dataset is loaded as the path to the file, so the node reads only what it needs.
+    # `profile` is a write profile of `pipeline_core.parquet` (default, fast, hot, archive).
+
+    def __init__(
+        self,
+        filepath: str,
+        lazy: bool = False,
+        profile: str | None = None,
+        metadata: dict[str, typing.Any] | None = None,
+    ) -> None:
+        self._filepath = pathlib.Path(filepath)
+        self._lazy = lazy
+        self._profile = profile
+        self.metadata = metadata
+
+    def load(self) -> pandas.DataFrame | pathlib.Path:
+        if self._lazy:
+            return self._filepath
+        return read_parquet(self._filepath)
+
+    def save(self, data: pandas.DataFrame | pyarrow.Table | StreamType) -> None:
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        if callable(data):
+            write_batches(data(), self._filepath, self._profile)
+        else:
+            write_parquet(data, self._filepath, self._profile)
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
+
+    def _describe(self) -> dict[str, typing.Any]:
+        return {"filepath": self._filepath, "lazy": self._lazy, "profile": self._profile}
+
+
+class IncrementalPartitionsDataset(PartitionedDataset):
+    # Partitions whose converted file in `target_path` is newer than the source are not
+    # loaded, so a run parses only the new or changed files, and nothing if all are up to date.
+
+    def __init__(
+        self,
+        *,
+        target_path: str,
+        target_suffix: str = ".parquet",
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._target_path = pathlib.Path(target_path)
+        self._target_suffix = target_suffix
+
+    def _is_stale(self, partition_id: str) -> bool:
+        source = pathlib.Path(self._partition_to_path(partition_id))
+        target = self._target_path / f"{partition_id}{self._target_suffix}"
+        try:
+            return target.stat().st_mtime_ns < source.stat().st_mtime_ns
+        except FileNotFoundError:
+            return True
+
+    def load(self) -> dict[str, typing.Callable[[], typing.Any]]:
+        partitions = super().load()
+        return {
+            partition_id: loader
+            for partition_id, loader in partitions.items()
+            if self._is_stale(partition_id)
+        }
+
+    def _describe(self) -> dict[str, typing.Any]:
+        return {**super()._describe(), "target_path": self._target_path}
+
+
+class SharedArrowDataset(
+    AbstractDataset[pandas.DataFrame | pyarrow.Table | StreamType, pyarrow.Table]
+):
+    # Intermediate kept as an uncompressed Arrow file in shared memory (tmpfs), loaded as a
+    # memory-mapped table: the worker processes of the `ParallelRunner` read the same pages,
+    # nothing is pickled, copied or written to disk. The file is deleted when the runner
+    # releases the dataset, after its last consumer has run.
+
+    def __init__(self, filename: str, metadata: dict[str, typing.Any] | None = None) -> None:
+        # Files of different project directories do not collide.
+        project = hashlib.blake2b(str(pathlib.Path.cwd()).encode(), digest_size=8).hexdigest()
+        self._filepath = SHARED_DIR / f"kedro-{project}" / filename
+        self.metadata = metadata
+
+    def load(self) -> pyarrow.Table:
+        return read_arrow(self._filepath)
+
+    def save(self, data: pandas.DataFrame | pyarrow.Table | StreamType) -> None:
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        write_arrow(data() if callable(data) else data, self._filepath)
+
+    def _release(self) -> None:
+        super()._release()
+        self._filepath.unlink(missing_ok=True)
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
+
+    def _describe(self) -> dict[str, typing.Any]:
+        return {"filepath": self._filepath}
+
+
+class LinearModelDataset(AbstractDataset[LinearModel, LinearModel]):
+    # Compact `.npz` model, see `pipeline_core.model`.
+
+    def __init__(self, filepath: str, metadata: dict[str, typing.Any] | None = None) -> None:
+        self._filepath = pathlib.Path(filepath)
+        self.metadata = metadata
+
+    def load(self) -> LinearModel:
+        return LinearModel.load(self._filepath)
+
+    def save(self, data: LinearModel) -> None:
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        data.save(self._filepath)
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
+
+    def _describe(self) -> dict[str, typing.Any]:
+        return {"filepath": self._filepath}
+
+
+class MomentsDataset(AbstractDataset[Moments, Moments]):
+    # Sufficient statistics of one date as `.npz`, see `pipeline_core.regression`.
+
+    def __init__(self, filepath: str, metadata: dict[str, typing.Any] | None = None) -> None:
+        self._filepath = pathlib.Path(filepath)
+        self.metadata = metadata
+
+    def load(self) -> Moments:
+        return Moments.load(self._filepath)
+
+    def save(self, data: Moments) -> None:
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        data.save(self._filepath)
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
+
+    def _describe(self) -> dict[str, typing.Any]:
+        return {"filepath": self._filepath}
@@ -0,0 +1,42 @@
+import typing
+
+from kedro.framework.hooks import hook_impl
+from kedro.pipeline.node import Node
+from pipeline_core.tracing import TRACER, Span
+
+
+class TracingHooks:
+    # Spans of the nodes, see `pipeline_core.tracing`. Lazy inputs are counted from the
+    # Parquet footers, partitions and streamed outputs have no row counts.
+
+    def __init__(self) -> None:
+        self.spans: dict[str, Span] = {}
+        self.unsaved: dict[str, set[str]] = {}
+
+    @hook_impl
+    def before_node_run(self, node: Node, inputs: dict[str, typing.Any]) -> None:
+        self.spans[node.name] = TRACER.start(node.name, inputs, framework="kedro")
+        self.unsaved[node.name] = set(node.outputs)
+
+    @hook_impl
+    def after_node_run(self, node: Node, outputs: dict[str, typing.Any]) -> None:
+        if node.name in self.spans:
+            self.spans[node.name].outputs = outputs
+            self.finish(node.name)
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str, node: Node) -> None:
+        # Lazy outputs are computed while they are saved, the span ends with the last one.
+        self.unsaved.get(node.name, set()).discard(dataset_name)
+        self.finish(node.name)
+
+    @hook_impl
+    def on_node_error(self, error: Exception, node: Node) -> None:
+        self.unsaved.pop(node.name, None)
+        if node.name in self.spans:
+            TRACER.end(self.spans.pop(node.name), error=repr(error))
+
+    def finish(self, name: str) -> None:
+        if name in self.spans and not self.unsaved.get(name):
+            self.unsaved.pop(name, None)
+            TRACER.end(self.spans.pop(name))
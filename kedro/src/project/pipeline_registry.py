@@ -1,50 +1,130 @@
+import functools
 import logging
+import pathlib
 import re
 import typing
 
 import kedro.pipeline
 import pandas
-import sklearn.linear_model
+import pyarrow
+from pipeline_core.concat import concat_reader
+from pipeline_core.footprint import Footprint, format_report, optimize_reader, optimize_table
+from pipeline_core.model import LinearModel, prediction_reader
+from pipeline_core.parquet import read_parquet
+from pipeline_core.regression import Moments, compute_moments, fit_linear_model, merge_moments
+from pipeline_core.statistics import Statistics, compute_statistics, read_dropped, read_imputed
+from pipeline_core.sweep import SweepReport, fit_candidate, read_candidate, sweep, sweep_report
 
-from .helpers import drop_columns_with_missing_values, fit_linear_model, impute_columns_with_mean
-
-LoaderType = typing.Callable[[], pandas.DataFrame]
+LoaderType = typing.Callable[[], pyarrow.Table]
+PathLoaderType = typing.Callable[[], pathlib.Path]
 logger = logging.getLogger(__name__)
 date_regex = re.compile(r"\d{4}-\d{2}-\d{2}")
 
 
-def convert(data: dict[str, LoaderType]) -> dict[str, pandas.DataFrame]:
+def convert(data: dict[str, LoaderType]) -> dict[str, LoaderType]:
     # In the case of partitioned dataset, the input
     # is a dictionary of filename and load method pairs.
+    # Only files newer than their Parquet file are loaded, one by one while they are saved.
     valid_names = [name for name in data.keys() if date_regex.match(name)]
     logger.info(f"Converting files: {valid_names}")
-    return {name: data[name]() for name in valid_names}
+    return {name: data[name] for name in valid_names}
 
 
-def concat(data: dict[str, LoaderType]) -> pandas.DataFrame:
+def concat(
+    data: dict[str, PathLoaderType],
+    streaming: bool,
+    memory_limit_mb: int,
+    optimize: bool,
+    tolerance: float,
+) -> pandas.DataFrame | pyarrow.Table | typing.Callable[[], pyarrow.RecordBatchReader]:
     valid_names = [name for name in data.keys() if date_regex.match(name)]
     logger.info(f"Concatenating files: {valid_names}")
-    dfs = [data[name]() for name in valid_names]
-    return pandas.concat(dfs).reset_index(drop=True)
+    paths = [data[name]() for name in valid_names]
+    footprint = Footprint(tolerance=tolerance)
+    if streaming:
+        # Batches are read only when the output dataset writes them.
+        open_reader = functools.partial(concat_reader, paths, memory_limit=memory_limit_mb * 2**20)
+        if not optimize:
+            return open_reader
+        reader, report = optimize_reader(open_reader, footprint)
+        logger.info(format_report(report))
+        return lambda: reader
+    dfs = [read_parquet(path) for path in paths]
+    concat = pandas.concat(dfs).reset_index(drop=True)
+    if not optimize:
+        return concat
+    table, report = optimize_table(concat, footprint)
+    logger.info(format_report(report))
+    return table
+
+
+def column_statistics(concat: pyarrow.Table) -> Statistics:
+    return compute_statistics(concat)
 
 
-def clean(concat: pandas.DataFrame, method: str) -> pandas.DataFrame:
+def clean(concat: pyarrow.Table, statistics: Statistics, method: str) -> pandas.DataFrame:
     if method == "drop":
-        clean = drop_columns_with_missing_values(concat, threshold=0.2)
+        clean = read_dropped(concat, statistics, threshold=0.2)
     elif method == "impute":
-        clean = impute_columns_with_mean(concat)
+        clean = read_imputed(concat, statistics)
     else:
         raise NotImplementedError(f"Unknown method: '{method}'")
     return clean
 
 
-def linear_regression(clean: pandas.DataFrame) -> sklearn.linear_model.LinearRegression:
-    model, r2_adj = fit_linear_model(
-        X=clean.drop(columns=clean.columns[0]),
-        y=clean.drop(columns=clean.columns[1:]),
+def moments(data: dict[str, PathLoaderType]) -> dict[str, typing.Callable[[], Moments]]:
+    # Only the dates without newer moments are loaded, a new date adds one partition.
+    # Returning callables saves the partitions one by one.
+    valid_names = [name for name in data.keys() if date_regex.match(name)]
+    logger.info(f"Computing moments of files: {valid_names}")
+    return {name: functools.partial(compute_moments, data[name]()) for name in valid_names}
+
+
+def linear_regression(
+    moments: dict[str, typing.Callable[[], Moments]],
+    method: str,
+) -> LinearModel:
+    # Solved from the sufficient statistics of all dates, the data is not read again.
+    fit = fit_linear_model(
+        merge_moments(moments[name]() for name in sorted(moments)),
+        method,
+        threshold=0.2,
     )
-    logger.info(f"Adjusted R2: {r2_adj:.3f}")
-    return model
+    logger.info(f"Adjusted R2: {fit.r2_adj:.3f}")
+    return fit.to_model()
+
+
+def sweep_cleaning(
+    moments: dict[str, typing.Callable[[], Moments]],
+    concat: pyarrow.Table,
+    statistics: Statistics,
+    thresholds: list[float],
+    winners: int,
+    feature_sets: dict[str, list[str]],
+) -> tuple[SweepReport, dict[str, typing.Callable[[], pandas.DataFrame]], dict[str, LinearModel]]:
+    # Every drop/impute threshold solved from the moments, only the winners are materialized.
+    merged = merge_moments(moments[name]() for name in sorted(moments))
+    results = sweep(merged, thresholds, feature_sets=feature_sets or None)
+    report = sweep_report(results, merged.rows, winners)
+    logger.info(f"Best cleaning strategies: {', '.join(report['winners'])}")
+    clean = {}
+    models = {}
+    for rank, result in enumerate(results[:winners], start=1):
+        # Read only when the partition is saved.
+        clean[f"clean_{rank}"] = functools.partial(
+            read_candidate, concat, statistics, result.candidate
+        )
+        models[f"linear_regression_{rank}"] = fit_candidate(merged, result.candidate).to_model()
+    return (report, clean, models)
+
+
+def predict(
+    model: LinearModel,
+    data: pyarrow.Table,
+    chunk_rows: int,
+) -> typing.Callable[[], pyarrow.RecordBatchReader]:
+    # Chunks are scored only when the output dataset writes them.
+    return functools.partial(prediction_reader, model, data, chunk_rows=chunk_rows)
 
 
 def create_pipeline() -> kedro.pipeline.Pipeline:
@@ -53,44 +133,110 @@ def create_pipeline() -> kedro.pipeline.Pipeline:
             kedro.pipeline.node(
                 func=convert,
                 inputs="raw_data_points",
-                outputs="data_points",
+                outputs="data_points@paths",
                 name=convert.__name__ + "_node",
             ),
             kedro.pipeline.node(
                 func=concat,
-                inputs="data_points",
+                inputs={
+                    "data": "data_points@paths",
+                    "streaming": "params:concat.streaming",
+                    "memory_limit_mb": "params:concat.memory_limit_mb",
+                    "optimize": "params:concat.optimize",
+                    "tolerance": "params:concat.tolerance",
+                },
                 outputs="concat_data",
                 name=concat.__name__ + "_node",
             ),
+            kedro.pipeline.node(
+                func=column_statistics,
+                inputs="concat_data",
+                outputs="concat_statistics",
+                name=column_statistics.__name__ + "_node",
+            ),
             kedro.pipeline.node(
                 func=clean,
-                inputs={"concat": "concat_data", "method": "params:drop"},
+                inputs={
+                    "concat": "concat_data",
+                    "statistics": "concat_statistics",
+                    "method": "params:drop",
+                },
                 outputs="clean_drop_data",
                 name=clean.__name__ + "_drop" + "_node",
             ),
             kedro.pipeline.node(
                 func=clean,
-                inputs={"concat": "concat_data", "method": "params:impute"},
+                inputs={
+                    "concat": "concat_data",
+                    "statistics": "concat_statistics",
+                    "method": "params:impute",
+                },
                 outputs="clean_impute_data",
                 name=clean.__name__ + "_impute" + "_node",
             ),
+            kedro.pipeline.node(
+                func=moments,
+                inputs="data_points@new",
+                outputs="data_moments",
+                name=moments.__name__ + "_node",
+            ),
             kedro.pipeline.node(
                 func=linear_regression,
-                inputs="clean_drop_data",
+                inputs={"moments": "data_moments", "method": "params:drop"},
                 outputs="linear_regression_drop_model",
                 name=linear_regression.__name__ + "_drop" + "_node",
             ),
             kedro.pipeline.node(
                 func=linear_regression,
-                inputs="clean_impute_data",
+                inputs={"moments": "data_moments", "method": "params:impute"},
                 outputs="linear_regression_impute_model",
                 name=linear_regression.__name__ + "_impute" + "_node",
             ),
+            kedro.pipeline.node(
+                func=predict,
+                inputs={
+                    "model": "linear_regression_drop_model",
+                    "data": "concat_data",
+                    "chunk_rows": "params:predict.chunk_rows",
+                },
+                outputs="prediction_drop_data",
+                name=predict.__name__ + "_drop" + "_node",
+            ),
+            kedro.pipeline.node(
+                func=predict,
+                inputs={
+                    "model": "linear_regression_impute_model",
+                    "data": "concat_data",
+                    "chunk_rows": "params:predict.chunk_rows",
+                },
+                outputs="prediction_impute_data",
+                name=predict.__name__ + "_impute" + "_node",
+            ),
         ]
     )
 
 
+def create_sweep_pipeline() -> kedro.pipeline.Pipeline:
+    # The stages the sweep needs and the sweep itself, run with `kedro run --pipeline sweep`.
+    sweep_node = kedro.pipeline.node(
+        func=sweep_cleaning,
+        inputs={
+            "moments": "data_moments",
+            "concat": "concat_data",
+            "statistics": "concat_statistics",
+            "thresholds": "params:sweep.thresholds",
+            "winners": "params:sweep.winners",
+            "feature_sets": "params:sweep.feature_sets",
+        },
+        outputs=["sweep_report", "sweep_clean_data", "sweep_models"],
+        name=sweep_cleaning.__name__ + "_node",
+    )
+    upstream = create_pipeline().to_outputs("data_moments", "concat_statistics")
+    return upstream + kedro.pipeline.pipeline([sweep_node])
+
+
 def register_pipelines() -> dict[str, kedro.pipeline.Pipeline]:
     pipelines: dict[str, kedro.pipeline.Pipeline] = {}
     pipelines["__default__"] = create_pipeline()
+    pipelines["sweep"] = create_sweep_pipeline()
     return pipelines
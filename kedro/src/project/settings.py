@@ -1,5 +1,8 @@
+from .hooks import TracingHooks
+
 CONF_SOURCE = "."
 CONFIG_LOADER_ARGS = {
     "base_env": ".",
     "default_run_env": ".",
 }
+HOOKS = (TracingHooks(),)
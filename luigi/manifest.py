@@ -0,0 +1,57 @@
+import datetime
+import json
+import os
+import pathlib
+import time
+
+
+class RawManifest:
+    # Dates of the raw Excel files, stored on disk together with the mtime of the directory.
+    # Adding, removing or renaming a file changes that mtime, so while it is unchanged
+    # the dates are read from the manifest (or memory) instead of listing the directory,
+    # and only the names that are new since the last listing are parsed.
+
+    # A directory changed twice within the mtime resolution keeps its mtime,
+    # so a listing of a directory modified this recently is not trusted.
+    racy_ns = 2_000_000_000
+
+    def __init__(self, directory: pathlib.Path, path: pathlib.Path) -> None:
+        self.directory = directory
+        self.path = path
+        self.mtime_ns: int | None = None
+        self.files: dict[str, str] = {}  # file name -> ISO date
+
+    def read(self) -> None:
+        try:
+            manifest = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.mtime_ns = manifest["mtime_ns"]
+        self.files = manifest["files"]
+
+    def write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps({"mtime_ns": self.mtime_ns, "files": self.files}))
+        temp_path.replace(self.path)
+
+    def dates(self) -> list[datetime.date]:
+        mtime_ns = self.directory.stat().st_mtime_ns
+        if self.mtime_ns is None:
+            self.read()
+        if mtime_ns != self.mtime_ns or time.time_ns() - mtime_ns < self.racy_ns:
+            self.update(mtime_ns)
+        return [datetime.date.fromisoformat(date) for date in self.files.values()]
+
+    def update(self, mtime_ns: int) -> None:
+        with os.scandir(self.directory) as entries:
+            names = sorted(entry.name for entry in entries if entry.name.endswith(".xlsx"))
+        files = {
+            name: self.files.get(name)
+            or datetime.datetime.strptime(name.removesuffix(".xlsx"), "%Y-%m-%d").date().isoformat()
+            for name in names
+        }
+        if files != self.files or mtime_ns != self.mtime_ns:
+            self.files = files
+            self.mtime_ns = mtime_ns
+            self.write()
@@ -0,0 +1,154 @@
+import json
+import math
+import os
+import pathlib
+import threading
+import typing
+
+import psutil
+
+import luigi
+
+ROOT = pathlib.Path(__file__).parent.resolve()
+
+# Bytes in memory per byte on disk of each input format, until a run of the task is measured.
+# Excel is zipped XML parsed into Python objects, Parquet is compressed columns.
+DEFAULT_FACTORS = {".xlsx": 8.0, ".parquet": 4.0}
+OTHER_FACTOR = 1.0
+
+
+class memory(luigi.Config):
+    # Learned expansion factors, shared by all worker processes, relative to this directory.
+    profile = luigi.Parameter(default="data/interim/memory_profile.json")
+    # Estimate of a task whose inputs do not exist yet and that never ran.
+    default_mb = luigi.IntParameter(default=512)
+    # Memory of a task without data (imports, buffers), added to every estimate. Runs that need
+    # less than this for their data are too small to learn from.
+    overhead_mb = luigi.IntParameter(default=64)
+    # Weight of the last run in the learned factors.
+    smoothing = luigi.FloatParameter(default=0.5)
+
+
+def budget_mb() -> int | None:
+    # The host memory the scheduler admits tasks against, `memory_mb` in `[resources]`.
+    value = luigi.configuration.get_config().get("resources", "memory_mb", None)
+    return int(value) if value is not None else None
+
+
+class MemoryProfile:
+    # Per task family: the expansion factor of every input format and the peak of the last run,
+    # from the peak RSS of past runs. Processes may overwrite each other's updates, which
+    # only delays the learning.
+
+    def __init__(self, path: pathlib.Path, overhead: int, smoothing: float) -> None:
+        self.path = path
+        self.overhead = overhead
+        self.smoothing = smoothing
+
+    def read(self) -> dict[str, typing.Any]:
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def write(self, profile: dict[str, typing.Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(profile, indent=2))
+        temp_path.replace(self.path)
+
+    def factors(self, family: str, sizes: dict[str, int]) -> dict[str, float]:
+        learned = self.read().get(family, {}).get("factors", {})
+        return {
+            suffix: learned.get(suffix, DEFAULT_FACTORS.get(suffix, OTHER_FACTOR))
+            for suffix in sizes
+        }
+
+    def estimate(self, family: str, sizes: dict[str, int]) -> int | None:
+        # Bytes the task needs for inputs of `sizes` bytes per format, or the peak of its last run
+        # without inputs on disk.
+        if sizes:
+            factors = self.factors(family, sizes)
+            data = sum(factors[suffix] * size for suffix, size in sizes.items())
+            return self.overhead + round(data)
+        return self.read().get(family, {}).get("peak")
+
+    def update(self, family: str, sizes: dict[str, int], peak: int) -> None:
+        # The memory above the overhead is split between the formats like in the estimate.
+        profile = self.read()
+        entry = profile.setdefault(family, {"factors": {}})
+        entry["peak"] = peak
+        data = peak - self.overhead
+        if data < self.overhead:
+            self.write(profile)
+            return
+        factors = self.factors(family, sizes)
+        weights = {suffix: factors[suffix] * size for suffix, size in sizes.items() if size > 0}
+        total = sum(weights.values())
+        for suffix, weight in weights.items():
+            observed = data * weight / total / sizes[suffix]
+            learned = entry["factors"].get(suffix)
+            if learned is not None:
+                observed = (1 - self.smoothing) * learned + self.smoothing * observed
+            entry["factors"][suffix] = observed
+        self.write(profile)
+
+
+class PeakSampler(threading.Thread):
+    # Peak RSS of the process above its RSS when started.
+
+    def __init__(self, interval: float = 0.05) -> None:
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process()
+        self.start_rss = self.process.memory_info().rss
+        self.peak_rss = self.start_rss
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def stop(self) -> int:
+        self.stopped.set()
+        self.join()
+        return max(self.peak_rss, self.process.memory_info().rss) - self.start_rss
+
+
+class MemoryMixin:
+    # Declares the memory the task needs as the `memory_mb` resource, estimated from the size
+    # of its input files, so the scheduler runs as many tasks at once as the budget admits.
+    # Tasks processing their inputs one by one (batched tasks) need the memory of the largest.
+    memory_aggregate: typing.Callable[[typing.Iterable[int]], int] = sum
+
+    def input_sizes(self) -> dict[str, int]:
+        # Bytes per input format (file suffix), only of the inputs that exist.
+        sizes: dict[str, list[int]] = {}
+        targets = luigi.task.flatten(self.input())  # type: ignore
+        for target in targets:
+            path = pathlib.Path(target.path)
+            if path.exists():
+                sizes.setdefault(path.suffix, []).append(path.stat().st_size)
+        return {suffix: self.memory_aggregate(values) for suffix, values in sizes.items()}
+
+    def memory_profile(self) -> MemoryProfile:
+        config = memory()
+        return MemoryProfile(ROOT / config.profile, config.overhead_mb * 2**20, config.smoothing)
+
+    @property
+    def resources(self) -> dict[str, int]:
+        budget = budget_mb()
+        if budget is None:
+            return {}  # no budget, the scheduler would not run tasks needing any
+        config = memory()
+        family = self.task_family  # type: ignore
+        estimate = self.memory_profile().estimate(family, self.input_sizes())
+        megabytes = config.default_mb if estimate is None else math.ceil(estimate / 2**20)
+        # Rounded up to a power of two, tasks with inputs of similar size have equal resources
+        # and are batched together by the scheduler.
+        megabytes = 2 ** math.ceil(math.log2(max(megabytes, 1)))
+        # A task above the budget runs alone instead of never.
+        return {"memory_mb": min(megabytes, budget)}
+
+    def learn_memory(self, peak: int) -> None:
+        self.memory_profile().update(self.task_family, self.input_sizes(), peak)  # type: ignore
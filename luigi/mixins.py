@@ -19,9 +19,10 @@ class MultiInMixin:
 
     @property
     def input_paths(self) -> list[Path]:
+        # Flattened, a required task may have several outputs.
         return [
             Path(input_path.path).resolve()
-            for input_path in typing.cast(list[luigi.LocalTarget], self.input())
+            for input_path in typing.cast(list[luigi.LocalTarget], luigi.task.flatten(self.input()))
         ]
 
 
@@ -37,3 +38,13 @@ class LoggerMixin:
 
     def log_info(self, message: str) -> None:
         logger.info(f"[{self.__class__.__name__}] {message}")
+
+
+class MultiOutMixin:
+
+    @property
+    def output_paths(self) -> list[Path]:
+        return [
+            Path(output_path.path).resolve()
+            for output_path in typing.cast(list[luigi.LocalTarget], self.output())
+        ]
@@ -1,16 +1,87 @@
 import datetime
 import enum
+import functools
+import itertools
 import pathlib
-import pickle
+import typing
 
 import pandas
-import sklearn.linear_model
-import sklearn.metrics
+from pipeline_core.concat import concat_reader
+from pipeline_core.excel import read_excel
+from pipeline_core.footprint import Footprint, format_report, optimize_reader, optimize_table
+from pipeline_core.model import LinearModel, predict_parquet
+from pipeline_core.parquet import read_parquet, write_batches, write_parquet
+from pipeline_core.partitions import date_window, partition_path, read_window
+from pipeline_core.regression import compute_moments, fit_linear_model, load_moments
+from pipeline_core.statistics import (
+    compute_statistics,
+    load_statistics,
+    read_dropped,
+    read_imputed,
+    save_statistics,
+    table_statistics,
+)
+from pipeline_core.sweep import (
+    DEFAULT_THRESHOLDS,
+    fit_candidate,
+    read_candidate,
+    save_report,
+    select_winners,
+    sweep,
+    sweep_report,
+)
+from pipeline_core.tracing import TRACER, Span
 
 import luigi
-from mixins import LoggerMixin, MultiInMixin, SingleInMixin, SingleOutMixin
+from manifest import RawManifest
+from memory import MemoryMixin, PeakSampler
+from mixins import LoggerMixin, MultiInMixin, MultiOutMixin, SingleInMixin, SingleOutMixin
 
 ROOT = pathlib.Path(__file__).parent.resolve()
+INTERIM = ROOT / "data" / "interim"
+RAW_MANIFEST = RawManifest(ROOT / "data" / "raw", INTERIM / "raw_manifest.json")
+
+
+class excel(luigi.Config):
+    # Excel reader of pipeline_core.excel: auto, calamine, openpyxl, pandas.
+    engine = luigi.Parameter(default="auto")
+
+
+class parquet(luigi.Config):
+    # Write profiles of pipeline_core.parquet: default, fast, hot, archive.
+    interim_profile = luigi.Parameter(default="hot")
+    processed_profile = luigi.Parameter(default="fast")
+
+
+class dataset(luigi.Config):
+    # Converted dates in the Hive layout `data/interim/date=YYYY-MM-DD/part-0.parquet`, read
+    # by date window with partition pruning, instead of `data/interim/YYYY-MM-DD.parquet`.
+    partitioned = luigi.BoolParameter(default=False)
+
+
+def merge_dates(values: typing.Iterable[tuple[datetime.date, ...]]) -> tuple[datetime.date, ...]:
+    return tuple(sorted(set(itertools.chain.from_iterable(values))))
+
+
+class DatesParameter(luigi.Parameter):
+    # Comma separated dates. The scheduler runs pending tasks of the same family
+    # as a single task with the dates of all of them.
+
+    def __init__(self, **kwargs: typing.Any) -> None:
+        super().__init__(batch_method=merge_dates, **kwargs)
+
+    def parse(self, x: str) -> tuple[datetime.date, ...]:
+        return tuple(datetime.date.fromisoformat(date) for date in x.split(","))
+
+    def serialize(self, x: tuple[datetime.date, ...]) -> str:
+        return ",".join(date.isoformat() for date in x)
+
+    def normalize(self, x: typing.Any) -> tuple[datetime.date, ...]:
+        return self.parse(x) if isinstance(x, str) else tuple(x)
+
+
+class OptionalDateParameter(luigi.parameter.OptionalParameterMixin, luigi.DateParameter):
+    expected_type = datetime.date
 
 
 class RawDataPoint(luigi.Task):
@@ -20,107 +91,321 @@ class RawDataPoint(luigi.Task):
         return luigi.LocalTarget(ROOT / "data" / "raw" / f"{self.date}.xlsx")
 
 
-class DataPoint(LoggerMixin, SingleInMixin, SingleOutMixin, luigi.Task):
-    date = luigi.DateParameter()
+class DataPoint(LoggerMixin, MemoryMixin, MultiInMixin, MultiOutMixin, luigi.Task):
+    # Batched, one worker converts up to `max_batch_size` dates in a single run.
+    dates = DatesParameter()
+    max_batch_size = 512
+    memory_aggregate = max  # one file at a time
 
-    def requires(self) -> RawDataPoint:  # type: ignore
-        return RawDataPoint(self.date)
+    def requires(self) -> list[RawDataPoint]:  # type: ignore
+        return [RawDataPoint(date) for date in self.dates]
 
     def run(self) -> None:
-        self.log_info(f"Converting '{self.input_path}' to '{self.output_path}'")
-        df = pandas.read_excel(self.input_path)
-        df.to_parquet(self.output_path)
+        self.log_info(f"Converting {len(self.dates)} files")
+        for input_path, output_path in zip(self.input_paths, self.output_paths):
+            table = read_excel(input_path, engine=excel().engine)
+            output_path.parent.mkdir(exist_ok=True)
+            write_parquet(table, output_path, profile=parquet().interim_profile)
 
-    def output(self) -> luigi.LocalTarget:  # type: ignore
-        return luigi.LocalTarget(ROOT / "data" / "interim" / f"{self.date}.parquet")
+    def output(self) -> list[luigi.LocalTarget]:  # type: ignore
+        if dataset().partitioned:
+            return [luigi.LocalTarget(partition_path(INTERIM, date)) for date in self.dates]
+        return [luigi.LocalTarget(INTERIM / f"{date}.parquet") for date in self.dates]
 
 
-class ConcatData(LoggerMixin, MultiInMixin, SingleOutMixin, luigi.Task):
+def raw_dates() -> list[datetime.date]:
+    return RAW_MANIFEST.dates()
+
+
+class WindowMixin:
+    # Trained on the last `window_days` dates up to `window_end` (the latest date by default)
+    # instead of all of them, the window is part of the output name.
+    window_days = luigi.IntParameter(default=0)  # 0 for all dates
+    window_end = OptionalDateParameter(default=None)
+
+    def window(self) -> tuple[datetime.date, datetime.date] | None:
+        if self.window_days <= 0:
+            return None
+        dates = raw_dates()
+        end = self.window_end or (dates[-1] if dates else datetime.date.today())
+        return date_window(end, self.window_days)
+
+    def window_dates(self) -> list[datetime.date]:
+        window = self.window()
+        if window is None:
+            return raw_dates()
+        start, end = window
+        return [date for date in raw_dates() if start <= date <= end]
+
+    def window_suffix(self) -> str:
+        window = self.window()
+        return "" if window is None else f"_{window[0]}_{window[1]}"
+
+
+class ConcatData(LoggerMixin, MemoryMixin, MultiInMixin, SingleOutMixin, luigi.Task):
     """"""
 
+    # Not significant, the output is the same with or without streaming.
+    streaming = luigi.BoolParameter(default=False, significant=False)
+    memory_limit_mb = luigi.IntParameter(default=256, significant=False)
+    # Smallest types holding the values, floats as float32 within `tolerance` relative error.
+    optimize = luigi.BoolParameter(default=False)
+    tolerance = luigi.FloatParameter(default=0.0)
+
     def requires(self) -> list[DataPoint]:  # type: ignore
-        excel_files = list((ROOT / "data" / "raw").glob("*.xlsx"))
-        dates = [datetime.datetime.strptime(file.stem, "%Y-%m-%d").date() for file in excel_files]
-        return [DataPoint(date) for date in dates]
+        return [DataPoint(dates=(date,)) for date in raw_dates()]
 
     def run(self) -> None:
-        dataframes = [pandas.read_parquet(path) for path in self.input_paths]
+        footprint = Footprint(tolerance=self.tolerance)
+        if self.streaming:
+            self.log_info(f"Streaming {len(self.input_paths)} files to '{self.output_path}'")
+            memory_limit = self.memory_limit_mb * 2**20
+            open_reader = functools.partial(concat_reader, self.input_paths, memory_limit)
+            if self.optimize:
+                reader, report = optimize_reader(open_reader, footprint)
+                self.log_info(format_report(report))
+            else:
+                reader = open_reader()
+            write_batches(reader, self.output_path, profile=parquet().interim_profile)
+            return
+        dataframes = [read_parquet(path) for path in self.input_paths]
         df = pandas.concat(dataframes).reset_index(drop=True)
-        df.to_parquet(self.output_path)
+        if self.optimize:
+            df, report = optimize_table(df, footprint)
+            self.log_info(format_report(report))
+        write_parquet(df, self.output_path, profile=parquet().interim_profile)
 
     def output(self) -> luigi.LocalTarget:  # type: ignore
         return luigi.LocalTarget(ROOT / "data" / "interim" / f"concat.parquet")
 
 
-class CleanDataMethod(enum.Enum):
-    drop = enum.auto()
-    impute = enum.auto()
+class ColumnStatistics(LoggerMixin, MemoryMixin, SingleInMixin, SingleOutMixin, luigi.Task):
 
+    def requires(self) -> ConcatData:  # type: ignore
+        return ConcatData()
 
-def drop_columns_with_missing_values(data: pandas.DataFrame, threshold: float) -> pandas.DataFrame:
-    column_mask = (data.isna().sum(axis="index") / data.shape[0]) > threshold
-    data = data.drop(columns=data.columns[column_mask])
-    if data.shape[1] == 0:
-        raise ValueError("No columns left after dropping")
-    return data
+    def run(self) -> None:
+        save_statistics(compute_statistics(self.input_path), self.output_path)
 
+    def output(self) -> luigi.LocalTarget:  # type: ignore
+        return luigi.LocalTarget(ROOT / "data" / "interim" / "concat_statistics.json")
 
-def impute_columns_with_mean(data: pandas.DataFrame) -> pandas.DataFrame:
-    data = data.fillna(data.mean(numeric_only=True))
-    return data
 
+class CleanDataMethod(enum.Enum):
+    drop = enum.auto()
+    impute = enum.auto()
 
-class CleanData(LoggerMixin, SingleInMixin, SingleOutMixin, luigi.Task):
+
+class CleanData(LoggerMixin, MemoryMixin, WindowMixin, MultiInMixin, SingleOutMixin, luigi.Task):
     method = luigi.EnumParameter(enum=CleanDataMethod)  # drop, impute
 
-    def requires(self) -> ConcatData:  # type: ignore
-        return ConcatData()
+    # A window reads only its dates, with the statistics of the window.
+    def requires(self) -> list[luigi.Task]:  # type: ignore
+        if self.window() is None:
+            return [ConcatData(), ColumnStatistics()]
+        return [DataPoint(dates=(date,)) for date in self.window_dates()]
 
     def run(self) -> None:
-        concat = pandas.read_parquet(self.input_path)
+        window = self.window()
+        if window is None:
+            source, statistics_path = self.input_paths
+            statistics = load_statistics(statistics_path)
+        else:
+            if len(self.input_paths) == 0:
+                raise ValueError(f"No dates from {window[0]} to {window[1]}")
+            if dataset().partitioned:
+                source = read_window(INTERIM, *window)
+            else:
+                source = concat_reader(self.input_paths).read_all()
+            statistics = table_statistics(source)
+            self.log_info(f"Cleaning {source.num_rows} rows from {window[0]} to {window[1]}")
         if self.method == CleanDataMethod.drop:
-            clean = drop_columns_with_missing_values(concat, threshold=0.2)
+            clean = read_dropped(source, statistics, threshold=0.2)
         elif self.method == CleanDataMethod.impute:
-            clean = impute_columns_with_mean(concat)
+            clean = read_imputed(source, statistics)
         else:
             raise NotImplementedError(f"Unknown method: '{self.method}'")
-        clean.to_parquet(self.output_path)
+        write_parquet(clean, self.output_path, profile=parquet().processed_profile)
 
     def output(self) -> luigi.LocalTarget:  # type: ignore
-        return luigi.LocalTarget(ROOT / "data" / "processed" / f"clean_{self.method.name}.parquet")
+        name = f"clean_{self.method.name}{self.window_suffix()}.parquet"
+        return luigi.LocalTarget(ROOT / "data" / "processed" / name)
+
+
+class DataMoments(LoggerMixin, MemoryMixin, MultiInMixin, MultiOutMixin, luigi.Task):
+    # Batched like DataPoint.
+    dates = DatesParameter()
+    max_batch_size = 512
+    memory_aggregate = max
+
+    def requires(self) -> DataPoint:  # type: ignore
+        return DataPoint(dates=self.dates)
+
+    def run(self) -> None:
+        for input_path, output_path in zip(self.input_paths, self.output_paths):
+            output_path.parent.mkdir(exist_ok=True)
+            compute_moments(input_path).save(output_path)
 
+    def output(self) -> list[luigi.LocalTarget]:  # type: ignore
+        return [
+            luigi.LocalTarget(ROOT / "data" / "interim" / "moments" / f"{date}.npz")
+            for date in self.dates
+        ]
 
-def adjusted_r2_score(r2: float, n: int, p: int) -> float:
-    return 1 - (1 - r2) * (n - 1) / (n - p - 1)
 
+class LinearRegression(
+    LoggerMixin, MemoryMixin, WindowMixin, MultiInMixin, SingleOutMixin, luigi.Task
+):
+    method = luigi.EnumParameter(enum=CleanDataMethod)  # drop, impute
+
+    # Fitted from the sufficient statistics of each date, a new date only adds one DataMoments.
+    # A window merges only the moments of its dates.
+    def requires(self) -> list[DataMoments]:  # type: ignore
+        return [DataMoments(dates=(date,)) for date in self.window_dates()]
 
-def fit_linear_model(
-    X: pandas.DataFrame, y: pandas.DataFrame
-) -> tuple[sklearn.linear_model.LinearRegression, float]:
-    model = sklearn.linear_model.LinearRegression()
-    model.fit(X, y)
-    r2 = sklearn.metrics.r2_score(y, model.predict(X))
-    r2_adj = adjusted_r2_score(r2=r2, n=X.shape[0], p=X.shape[1])
-    return (model, r2_adj)
+    def run(self) -> None:
+        window = self.window()
+        if window is not None and len(self.input_paths) == 0:
+            raise ValueError(f"No dates from {window[0]} to {window[1]}")
+        moments = load_moments(self.input_paths)
+        fit = fit_linear_model(moments, self.method.name, threshold=0.2)
+        self.log_info(f"Adjusted R2: {fit.r2_adj}")
+        fit.to_model().save(self.output_path)
+
+    def output(self) -> luigi.LocalTarget:  # type: ignore
+        name = f"linear_regression_{self.method.name}{self.window_suffix()}.npz"
+        return luigi.LocalTarget(ROOT / "models" / name)
 
 
-class LinearRegression(LoggerMixin, SingleInMixin, SingleOutMixin, luigi.Task):
+class Sweep(LoggerMixin, MemoryMixin, MultiInMixin, MultiOutMixin, luigi.Task):
+    # Every drop/impute threshold solved from the moments, only the `winners` best (by adjusted
+    # R²) are written as clean data and models. Not required by AllData.
+    thresholds = luigi.ListParameter(default=DEFAULT_THRESHOLDS)
+    winners = luigi.IntParameter(default=2)
+    feature_sets = luigi.DictParameter(default={})  # named feature subsets, besides all
+
+    def requires(self) -> list[luigi.Task]:  # type: ignore
+        moments = [DataMoments(dates=(date,)) for date in raw_dates()]
+        return [*moments, ConcatData(), ColumnStatistics()]
+
+    def run(self) -> None:
+        *moment_paths, concat_path, statistics_path = self.input_paths
+        moments = load_moments(moment_paths)
+        thresholds = [float(value) for value in self.thresholds]
+        results = sweep(moments, thresholds, feature_sets=self.feature_sets or None)
+        # Every declared output is written, or Luigi would run the task again.
+        winners = select_winners(results, self.winners)
+        report = sweep_report(results, moments.rows, self.winners)
+        statistics = load_statistics(statistics_path)
+        report_path, *output_paths = self.output_paths
+        clean_paths, model_paths = output_paths[: self.winners], output_paths[self.winners :]
+        for result, clean_path, model_path in zip(winners, clean_paths, model_paths):
+            clean_path.parent.mkdir(exist_ok=True)
+            model_path.parent.mkdir(exist_ok=True)
+            clean = read_candidate(concat_path, statistics, result.candidate)
+            write_parquet(clean, clean_path, profile=parquet().processed_profile)
+            fit_candidate(moments, result.candidate).to_model().save(model_path)
+        save_report(report, report_path)
+        self.log_info(f"Best cleaning strategies: {', '.join(report['winners'])}")
+
+    def output(self) -> list[luigi.LocalTarget]:  # type: ignore
+        directory = ROOT / "data" / "processed" / "sweep"
+        ranks = range(1, self.winners + 1)
+        return [
+            luigi.LocalTarget(directory / "report.json"),
+            *[luigi.LocalTarget(directory / f"clean_{rank}.parquet") for rank in ranks],
+            *[
+                luigi.LocalTarget(ROOT / "models" / "sweep" / f"linear_regression_{rank}.npz")
+                for rank in ranks
+            ],
+        ]
+
+
+class Prediction(LoggerMixin, MemoryMixin, MultiInMixin, SingleOutMixin, luigi.Task):
     method = luigi.EnumParameter(enum=CleanDataMethod)  # drop, impute
+    # Not significant, the output is the same for any chunk size.
+    chunk_rows = luigi.IntParameter(default=65536, significant=False)
 
-    def requires(self) -> CleanData:  # type: ignore
-        return CleanData(method=self.method)
+    def requires(self) -> list[luigi.Task]:  # type: ignore
+        return [LinearRegression(method=self.method), ConcatData()]
 
     def run(self) -> None:
-        data = pandas.read_parquet(self.input_path)
-        model, r2_adj = fit_linear_model(
-            X=data.drop(columns=data.columns[0]),
-            y=data.drop(columns=data.columns[1:]),
+        model_path, data_path = self.input_paths
+        model = LinearModel.load(model_path)
+        rows = predict_parquet(
+            model,
+            data_path,
+            self.output_path,
+            chunk_rows=self.chunk_rows,
+            profile=parquet().processed_profile,
         )
-        self.log_info(f"Adjusted R2: {r2_adj}")
-        self.output_path.write_bytes(pickle.dumps(model))
+        self.log_info(f"Scored {rows} rows")
 
     def output(self) -> luigi.LocalTarget:  # type: ignore
-        return luigi.LocalTarget(ROOT / "models" / f"linear_regression_{self.method.name}.pkl")
+        path = ROOT / "data" / "processed" / f"prediction_{self.method.name}.parquet"
+        return luigi.LocalTarget(path)
+
+
+class AllData(luigi.WrapperTask):
+    # The cleaned data is no longer an input of the regression, build both explicitly.
+    def requires(self) -> list[luigi.Task]:  # type: ignore
+        tasks: list[luigi.Task] = []
+        for method in CleanDataMethod:
+            tasks += [CleanData(method=method), Prediction(method=method)]
+        return tasks
+
+
+# Spans of the tasks running in this process, events are triggered in the process running the task.
+spans: dict[str, Span] = {}
+# Memory of the tasks running in this process, learned by their task family on success.
+samplers: dict[str, PeakSampler] = {}
+
+
+def target_paths(targets: typing.Any) -> list[pathlib.Path]:
+    return [
+        pathlib.Path(target.path)
+        for target in luigi.task.flatten(targets)
+        if isinstance(target, luigi.LocalTarget)
+    ]
+
+
+@luigi.Task.event_handler(luigi.Event.START)
+def trace_start(task: luigi.Task) -> None:
+    inputs = target_paths(task.input())
+    spans[task.task_id] = TRACER.start(
+        task.task_family, inputs, framework="luigi", task=task.task_id
+    )
+
+
+@luigi.Task.event_handler(luigi.Event.START)
+def memory_start(task: luigi.Task) -> None:
+    if isinstance(task, MemoryMixin):
+        samplers[task.task_id] = PeakSampler()
+        samplers[task.task_id].start()
+
+
+@luigi.Task.event_handler(luigi.Event.SUCCESS)
+def memory_success(task: luigi.Task) -> None:
+    if task.task_id in samplers:
+        task.learn_memory(samplers.pop(task.task_id).stop())
+
+
+@luigi.Task.event_handler(luigi.Event.FAILURE)
+def memory_failure(task: luigi.Task, exception: BaseException) -> None:
+    if task.task_id in samplers:
+        samplers.pop(task.task_id).stop()
+
+
+@luigi.Task.event_handler(luigi.Event.SUCCESS)
+def trace_success(task: luigi.Task) -> None:
+    if task.task_id in spans:
+        TRACER.end(spans.pop(task.task_id), outputs=target_paths(task.output()))
+
+
+@luigi.Task.event_handler(luigi.Event.FAILURE)
+def trace_failure(task: luigi.Task, exception: BaseException) -> None:
+    if task.task_id in spans:
+        TRACER.end(spans.pop(task.task_id), error=repr(exception))
 
 
 if __name__ == "__main__":
@@ -1,19 +1,32 @@
-import pickle
+import functools
 import pprint
 from pathlib import Path
 
 import pandas
+from pipeline_core.concat import concat_reader
+from pipeline_core.excel import read_excel
+from pipeline_core.footprint import Footprint, format_report, optimize_reader, optimize_table
+from pipeline_core.model import LinearModel, predict_parquet
+from pipeline_core.parquet import read_parquet, write_batches, write_parquet
+from pipeline_core.regression import compute_moments, fit_linear_model, load_moments
+from pipeline_core.statistics import (
+    compute_statistics,
+    load_statistics,
+    read_dropped,
+    read_imputed,
+    save_statistics,
+)
+from pipeline_core.sweep import fit_candidate, read_candidate, save_report, sweep, sweep_report
 
 import prefect
 import prefect.artifacts
 from helpers import (
     BYTES,
     MTIME,
+    TRACE_HOOKS,
     CleanDataMethod,
     add_table_to_artifact,
-    drop_columns_with_missing_values,
-    fit_linear_model,
-    impute_columns_with_mean,
+    create_task_runner,
 )
 from prefect.cache_policies import INPUTS, TASK_SOURCE
 
@@ -24,77 +37,186 @@ PROCESSED_DIR = ROOT / "data" / "processed"
 MODELS_DIR = ROOT / "models"
 
 
-@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES)
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
 def convert(input_path: Path) -> Path:
-    data = pandas.read_excel(input_path)
+    table = read_excel(input_path)
     output_path = INTERIM_DIR / f"{input_path.stem}.parquet"
-    data.to_parquet(output_path)
-    add_table_to_artifact(data, key="table")
+    write_parquet(table, output_path)
+    add_table_to_artifact(table, key="table")
     return output_path
 
 
-@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES)
-def concat(input_paths: list[Path]) -> Path:
-    dataframes = [pandas.read_parquet(path) for path in input_paths]
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
+def concat(
+    input_paths: list[Path],
+    streaming: bool = False,
+    memory_limit_mb: int = 256,
+    optimize: bool = False,
+    tolerance: float = 0.0,
+) -> Path:
     output_path = INTERIM_DIR / "concat.parquet"
+    footprint = Footprint(tolerance=tolerance)
+    if streaming:
+        # No table artifact, it would need the whole dataset in memory.
+        open_reader = functools.partial(concat_reader, input_paths, memory_limit_mb * 2**20)
+        if optimize:
+            reader, report = optimize_reader(open_reader, footprint)
+            prefect.get_run_logger().info(format_report(report))
+        else:
+            reader = open_reader()
+        write_batches(reader, output_path)
+        return output_path
+    dataframes = [read_parquet(path) for path in input_paths]
     concat = pandas.concat(dataframes).reset_index(drop=True)
-    concat.to_parquet(output_path)
     add_table_to_artifact(concat, key="table")
+    if optimize:
+        table, report = optimize_table(concat, footprint)
+        prefect.get_run_logger().info(format_report(report))
+        write_parquet(table, output_path)
+    else:
+        write_parquet(concat, output_path)
+    return output_path
+
+
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
+def column_statistics(input_path: Path) -> Path:
+    output_path = INTERIM_DIR / "concat_statistics.json"
+    save_statistics(compute_statistics(input_path), output_path)
     return output_path
 
 
-@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES)
-def clean(input_path: Path, method: CleanDataMethod) -> Path:
-    concat = pandas.read_parquet(input_path)
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
+def clean(input_paths: list[Path], method: CleanDataMethod) -> Path:
+    concat_path, statistics_path = input_paths
+    statistics = load_statistics(statistics_path)
     if method == CleanDataMethod.drop:
-        clean = drop_columns_with_missing_values(concat, threshold=0.2)
+        clean = read_dropped(concat_path, statistics, threshold=0.2)
     elif method == CleanDataMethod.impute:
-        clean = impute_columns_with_mean(concat)
+        clean = read_imputed(concat_path, statistics)
     else:
         raise NotImplementedError(f"Unknown method: {method}")
     output_path = PROCESSED_DIR / f"clean_{method.name}.parquet"
-    clean.to_parquet(output_path)
+    write_parquet(clean, output_path)
     add_table_to_artifact(clean, key=f"table-{method.name}")
     return output_path
 
 
-@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES)
-def linear_regression(input_path: Path, method: CleanDataMethod) -> Path:
-    data = pandas.read_parquet(input_path)
-    model, r2_adj = fit_linear_model(
-        X=data.drop(columns=data.columns[0]),
-        y=data.drop(columns=data.columns[1:]),
-    )
-    output_path = MODELS_DIR / f"linear_model_{method.name}.pkl"
-    output_path.write_bytes(pickle.dumps(model))
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
+def moments(input_path: Path) -> Path:
+    output_path = INTERIM_DIR / "moments" / f"{input_path.stem}.npz"
+    output_path.parent.mkdir(exist_ok=True)
+    compute_moments(input_path).save(output_path)
+    return output_path
+
+
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
+def linear_regression(input_paths: list[Path], method: CleanDataMethod) -> Path:
+    fit = fit_linear_model(load_moments(input_paths), method.name, threshold=0.2)
+    output_path = MODELS_DIR / f"linear_model_{method.name}.npz"
+    fit.to_model().save(output_path)
     prefect.artifacts.create_markdown_artifact(
-        f"Adjusted R2: {r2_adj:.3f}",
+        f"Adjusted R2: {fit.r2_adj:.3f}",
         key=f"metric-{method.name}",
     )
     return output_path
 
 
-@prefect.flow()
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
+def sweep_cleaning(
+    input_paths: list[Path],
+    thresholds: list[float],
+    winners: int,
+    feature_sets: dict[str, list[str]] | None = None,
+) -> list[Path]:
+    # Every drop/impute threshold solved from the moments, only the winners are materialized.
+    *moments_paths, concat_path, statistics_path = input_paths
+    moments = load_moments(moments_paths)
+    results = sweep(moments, thresholds, feature_sets=feature_sets)
+    report = sweep_report(results, moments.rows, winners)
+    statistics = load_statistics(statistics_path)
+    output_paths = []
+    for rank, result in enumerate(results[:winners], start=1):
+        clean_path = PROCESSED_DIR / "sweep" / f"clean_{rank}.parquet"
+        model_path = MODELS_DIR / "sweep" / f"linear_model_{rank}.npz"
+        clean_path.parent.mkdir(exist_ok=True)
+        model_path.parent.mkdir(exist_ok=True)
+        write_parquet(read_candidate(concat_path, statistics, result.candidate), clean_path)
+        fit_candidate(moments, result.candidate).to_model().save(model_path)
+        output_paths += [clean_path, model_path]
+    report_path = PROCESSED_DIR / "sweep" / "report.json"
+    report_path.parent.mkdir(exist_ok=True)
+    save_report(report, report_path)
+    rows = [f"| {c['name']} | {c['r2']:.3f} | {c['r2_adj']:.3f} |" for c in report["candidates"]]
+    prefect.artifacts.create_markdown_artifact(
+        "\n".join(["| candidate | R2 | adjusted R2 |", "| --- | --- | --- |", *rows]),
+        key="sweep",
+    )
+    return [report_path, *output_paths]
+
+
+@prefect.task(cache_policy=INPUTS + TASK_SOURCE + MTIME + BYTES, **TRACE_HOOKS)
+def predict(input_paths: list[Path], method: CleanDataMethod, chunk_rows: int = 65536) -> Path:
+    model_path, data_path = input_paths
+    output_path = PROCESSED_DIR / f"prediction_{method.name}.parquet"
+    rows = predict_parquet(LinearModel.load(model_path), data_path, output_path, chunk_rows)
+    prefect.get_run_logger().info(f"Scored {rows} rows")
+    return output_path
+
+
+@prefect.flow(task_runner=create_task_runner())
 def workflow(
     excel_paths: list[Path],
     methods: list[CleanDataMethod],
+    streaming_concat: bool = False,
+    optimize_concat: bool = False,
+    concat_tolerance: float = 0.0,
+    sweep_thresholds: list[float] | None = None,
+    sweep_winners: int = 2,
+    sweep_feature_sets: dict[str, list[str]] | None = None,
 ) -> dict[str, list[Path]]:
     parquet_paths = convert.map(input_path=excel_paths)
-    concat_path = concat.submit(input_paths=parquet_paths)  # type: ignore
+    concat_path = concat.submit(
+        input_paths=parquet_paths,  # type: ignore
+        streaming=streaming_concat,
+        optimize=optimize_concat,
+        tolerance=concat_tolerance,
+    )
+    statistics_path = column_statistics.submit(input_path=concat_path)  # type: ignore
     clean_paths = clean.map(
-        input_path=prefect.unmapped(concat_path),
+        input_paths=prefect.unmapped([concat_path, statistics_path]),
         method=methods,
     )
+    # Sufficient statistics of each date, only new or changed dates miss the cache.
+    moments_paths = moments.map(input_path=parquet_paths)
     linear_regression_paths = linear_regression.map(
-        input_path=clean_paths,
+        input_paths=prefect.unmapped(moments_paths),
+        method=methods,
+    )
+    prediction_paths = predict.map(
+        input_paths=[[model_path, concat_path] for model_path in linear_regression_paths],
         method=methods,
     )
-    return {
+    # Optional, the drop/impute thresholds to evaluate from the moments.
+    sweep_paths = None
+    if sweep_thresholds is not None:
+        sweep_paths = sweep_cleaning.submit(
+            input_paths=[*moments_paths, concat_path, statistics_path],  # type: ignore
+            thresholds=sweep_thresholds,
+            winners=sweep_winners,
+            feature_sets=sweep_feature_sets,
+        )
+    results = {
         convert.name: parquet_paths.result(),
         concat.name: [concat_path.result()],
+        column_statistics.name: [statistics_path.result()],
         clean.name: clean_paths.result(),
+        moments.name: moments_paths.result(),
         linear_regression.name: linear_regression_paths.result(),
+        predict.name: prediction_paths.result(),
     }
+    if sweep_paths is not None:
+        results[sweep_cleaning.name] = sweep_paths.result()
+    return results
 
 
 if __name__ == "__main__":
@@ -1,15 +1,25 @@
 import enum
 import hashlib
+import os
+import sqlite3
+import threading
+import time
+import typing
 from pathlib import Path
 
+import numpy
 import pandas
-import sklearn.linear_model
-import sklearn.metrics
+import pyarrow
+import pyarrow.compute
+from pipeline_core.tracing import TRACER, Span
 
 import prefect
 import prefect.artifacts
 import prefect.cache_policies
 import prefect.context
+import prefect.futures
+import prefect.task_runners
+from prefect.client.schemas.objects import TaskRun
 
 
 def parameters_to_paths(context: prefect.context.TaskRunContext) -> list[Path]:
@@ -42,18 +52,75 @@ def hash_mtime(context: prefect.context.TaskRunContext, parameters: dict[str, ob
     return _hash.hexdigest()
 
 
+def hash_file(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()
+
+
+class FingerprintIndex:
+    # Content hashes of files stored on disk and keyed by the file's stat,
+    # a file is read again only if its size, mtime or inode changed.
+    # SQLite serializes writes from concurrent threads and processes.
+
+    # A file changed twice within the mtime resolution keeps its stat,
+    # so hashes of files modified this recently are not stored.
+    racy_ns = 2_000_000_000
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        # One connection per thread, a forked process must not reuse its parent's one.
+        pid, connection = getattr(self.local, "connection", (None, None))
+        if connection is None or pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=60.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, digest TEXT)"
+            )
+            self.local.connection = (os.getpid(), connection)
+        return connection
+
+    def digest(self, path: Path) -> str:
+        path = path.resolve()
+        stat = path.stat()
+        key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        connection = self.connection()
+        row = connection.execute(
+            "SELECT size, mtime_ns, inode, digest FROM fingerprints WHERE path = ?",
+            (str(path),),
+        ).fetchone()
+        if row is not None and tuple(row[:3]) == key:
+            return row[3]
+        digest = hash_file(path)
+        restat = path.stat()
+        unchanged = key == (restat.st_size, restat.st_mtime_ns, restat.st_ino)
+        if unchanged and time.time_ns() - stat.st_mtime_ns > self.racy_ns:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+                    (str(path), *key, digest),
+                )
+        return digest
+
+
+FINGERPRINTS = FingerprintIndex(Path(__file__).parent / ".prefect" / "fingerprints.sqlite")
+
+
 def hash_bytes(context: prefect.context.TaskRunContext, parameters: dict[str, object]) -> str:
     logger = prefect.get_run_logger(context)
     paths = parameters_to_paths(context)
     _hash = hashlib.blake2b(digest_size=64)
     for path in paths:
         try:
-            with path.open("rb") as f:
-                for chunk in iter(lambda: f.read(8192), b""):
-                    _hash.update(chunk)
-            logger.debug(f"File '{path}' read")
+            digest = FINGERPRINTS.digest(path)
+            logger.debug(f"File '{path}' digest: {digest}")
+            _hash.update(digest.encode("utf-8"))
         except FileNotFoundError:
-            msg = f"File '{path}' not found while checking mtime"
+            msg = f"File '{path}' not found while checking bytes"
             logger.error(msg)
             raise FileNotFoundError(msg)
     return _hash.hexdigest()
@@ -63,45 +130,201 @@ MTIME = prefect.cache_policies.CachePolicy.from_cache_key_fn(hash_mtime)
 BYTES = prefect.cache_policies.CachePolicy.from_cache_key_fn(hash_bytes)
 
 
+# Spans of the task runs in this process, keyed by task run, hooks run in the task's thread.
+SPANS: dict[str, Span] = {}
+
+
+def resolve_future(value: object) -> object:
+    return value.result() if isinstance(value, prefect.futures.PrefectFuture) else value
+
+
+def trace_running(task: prefect.Task, task_run: TaskRun, state: prefect.State) -> None:
+    context = prefect.context.TaskRunContext.get()
+    parameters = context.parameters if context is not None else {}
+    inputs = parameters.get("input_paths", parameters.get("input_path"))
+    # Upstream results are still futures when the hook runs, they are done by now.
+    if isinstance(inputs, list):
+        inputs = [resolve_future(value) for value in inputs]
+    else:
+        inputs = resolve_future(inputs)
+    SPANS[str(task_run.id)] = TRACER.start(
+        task.name, inputs, framework="prefect", task_run=task_run.name
+    )
+
+
+def trace_completion(task: prefect.Task, task_run: TaskRun, state: prefect.State) -> None:
+    span = SPANS.pop(str(task_run.id), None)
+    if span is not None:
+        TRACER.end(span, outputs=state.result())
+
+
+def trace_failure(task: prefect.Task, task_run: TaskRun, state: prefect.State) -> None:
+    span = SPANS.pop(str(task_run.id), None)
+    if span is not None:
+        TRACER.end(span, error=state.message or state.name)
+
+
+TRACE_HOOKS = {
+    "on_running": [trace_running],
+    "on_completion": [trace_completion],
+    "on_failure": [trace_failure],
+}
+
+
+class ArtifactMode(enum.Enum):
+    full = enum.auto()  # all rows
+    head = enum.auto()  # first rows
+    head_tail = enum.auto()  # first and last rows
+    sample = enum.auto()  # uniformly sampled rows
+    summary = enum.auto()  # column summary only
+
+
+ARTIFACT_MODE = ArtifactMode[os.environ.get("ARTIFACT_MODE", "head_tail")]
+ARTIFACT_MAX_ROWS = int(os.environ.get("ARTIFACT_MAX_ROWS", "100"))
+
+
+def row_positions(
+    num_rows: int,
+    mode: ArtifactMode,
+    max_rows: int,
+    seed: int = 0,
+) -> numpy.ndarray | None:
+    # Positions of the rows shown in the artifact, None for all rows.
+    if mode == ArtifactMode.full or num_rows <= max_rows:
+        return None
+    if mode == ArtifactMode.head:
+        return numpy.arange(max_rows)
+    if mode == ArtifactMode.head_tail:
+        head = numpy.arange(max_rows - max_rows // 2)
+        return numpy.concatenate([head, numpy.arange(num_rows - max_rows // 2, num_rows)])
+    if mode == ArtifactMode.sample:
+        rng = numpy.random.default_rng(seed)
+        return numpy.sort(rng.choice(num_rows, size=max_rows, replace=False))
+    return numpy.arange(0)
+
+
+def select_rows(
+    table: pandas.DataFrame | pyarrow.Table,
+    mode: ArtifactMode,
+    max_rows: int,
+    seed: int = 0,
+) -> pandas.DataFrame | pyarrow.Table:
+    # Only the selected rows of an Arrow table are copied.
+    positions = row_positions(table.shape[0], mode, max_rows, seed)
+    if positions is None:
+        return table
+    if isinstance(table, pyarrow.Table):
+        return table.take(positions)
+    return table.iloc[positions]
+
+
+def to_records(table: pandas.DataFrame | pyarrow.Table) -> list[dict[str, typing.Any]]:
+    if isinstance(table, pyarrow.Table):
+        return table.to_pylist()
+    return table.to_dict("records")  # type: ignore
+
+
+def summarize_columns(table: pandas.DataFrame) -> list[dict[str, typing.Any]]:
+    # Reductions column by column, the frame is never copied into one float block.
+    summary = []
+    for name, column in table.items():
+        row = {
+            "column": name,
+            "dtype": str(column.dtype),
+            "null_count": int(column.isna().sum()),
+            "min": None,
+            "max": None,
+            "mean": None,
+        }
+        numeric = pandas.api.types.is_numeric_dtype(column.dtype)
+        if numeric and not pandas.api.types.is_bool_dtype(column.dtype):
+            for key, value in [
+                ("min", column.min()),
+                ("max", column.max()),
+                ("mean", column.mean()),
+            ]:
+                if not pandas.isna(value):
+                    row[key] = value.item() if isinstance(value, numpy.generic) else value
+        summary.append(row)
+    return summary
+
+
+def summarize_arrow_columns(table: pyarrow.Table) -> list[dict[str, typing.Any]]:
+    # The same summary straight from the Arrow columns, nothing is converted to pandas. Null
+    # counts are kept by the arrays, min, max and mean are Arrow kernels skipping the nulls.
+    summary = []
+    for field, column in zip(table.schema, table.columns):
+        row = {
+            "column": field.name,
+            "dtype": str(field.type),
+            "null_count": column.null_count,
+            "min": None,
+            "max": None,
+            "mean": None,
+        }
+        if pyarrow.types.is_integer(field.type) or pyarrow.types.is_floating(field.type):
+            min_max = pyarrow.compute.min_max(column)
+            row["min"] = min_max["min"].as_py()
+            row["max"] = min_max["max"].as_py()
+            row["mean"] = pyarrow.compute.mean(column).as_py()
+        summary.append(row)
+    return summary
+
+
 def add_table_to_artifact(
-    table: pandas.DataFrame,
+    table: pandas.DataFrame | pyarrow.Table,
     key: str | None = None,
     description: str | None = None,
+    mode: ArtifactMode = ARTIFACT_MODE,
+    max_rows: int = ARTIFACT_MAX_ROWS,
 ) -> None:
+    if mode != ArtifactMode.summary:
+        rows = select_rows(table, mode, max_rows)
+        rows_description = f"{rows.shape[0]} of {table.shape[0]} rows ({mode.name})"
+        prefect.artifacts.create_table_artifact(
+            to_records(rows),
+            key=key,
+            description=f"{description}\n\n{rows_description}" if description else rows_description,
+        )
+    if isinstance(table, pyarrow.Table):
+        summary = summarize_arrow_columns(table)
+    else:
+        summary = summarize_columns(table)
     prefect.artifacts.create_table_artifact(
-        table.to_dict("records"),  # type: ignore
-        key=key,
+        summary,
+        key=f"{key}-summary" if key else None,
         description=description,
     )
 
 
-class CleanDataMethod(enum.Enum):
-    drop = enum.auto()
-    impute = enum.auto()
+class TaskRunnerMode(enum.Enum):
+    thread = enum.auto()  # one process, CPU-bound tasks are serialized by the GIL
+    process = enum.auto()  # local process pool, results and cache keys are paths
 
 
-def drop_columns_with_missing_values(data: pandas.DataFrame, threshold: float) -> pandas.DataFrame:
-    column_mask = (data.isna().sum(axis="index") / data.shape[0]) > threshold
-    data = data.drop(columns=data.columns[column_mask])
-    if data.shape[1] == 0:
-        raise ValueError("No columns left after dropping")
-    return data
+def available_cpus() -> int:
+    # CPUs this process may run on, fewer than the host's in a container or with taskset.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
 
-def impute_columns_with_mean(data: pandas.DataFrame) -> pandas.DataFrame:
-    data = data.fillna(data.mean(numeric_only=True))
-    return data
+TASK_RUNNER = TaskRunnerMode[os.environ.get("TASK_RUNNER", "thread")]
+# None keeps the default of Prefect for threads and the available CPUs for processes.
+TASK_RUNNER_MAX_WORKERS = int(os.environ.get("TASK_RUNNER_MAX_WORKERS") or "0") or None
 
 
-def adjusted_r2_score(r2: float, n: int, p: int) -> float:
-    return 1 - (1 - r2) * (n - 1) / (n - p - 1)
+def create_task_runner(
+    mode: TaskRunnerMode = TASK_RUNNER,
+    max_workers: int | None = TASK_RUNNER_MAX_WORKERS,
+) -> prefect.task_runners.TaskRunner:
+    if mode == TaskRunnerMode.process:
+        return prefect.task_runners.ProcessPoolTaskRunner(
+            max_workers=max_workers or available_cpus()
+        )
+    return prefect.task_runners.ThreadPoolTaskRunner(max_workers=max_workers)
 
 
-def fit_linear_model(
-    X: pandas.DataFrame, y: pandas.DataFrame
-) -> tuple[sklearn.linear_model.LinearRegression, float]:
-    model = sklearn.linear_model.LinearRegression()
-    model.fit(X, y)
-    r2 = sklearn.metrics.r2_score(y, model.predict(X))
-    r2_adj = adjusted_r2_score(r2=r2, n=X.shape[0], p=X.shape[1])  # type: ignore
-    return (model, r2_adj)
+class CleanDataMethod(enum.Enum):
+    drop = enum.auto()
+    impute = enum.auto()
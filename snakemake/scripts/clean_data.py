@@ -1,15 +1,18 @@
-import pandas
-from _helpers import drop_columns_with_missing_values, extract, impute_columns_with_mean
+from _helpers import extract, traced
+from pipeline_core.parquet import write_parquet
+from pipeline_core.statistics import load_statistics, read_dropped, read_imputed
 
 inputs, outputs, params, wildcards = extract(snakemake)  # type: ignore
-threshold = float(params["threshold"])
-method = wildcards["method"]
 
-concat = pandas.read_parquet(inputs[0])
-if method == "drop":
-    clean = drop_columns_with_missing_values(concat, threshold)
-elif method == "impute":
-    clean = impute_columns_with_mean(concat)
-else:
-    raise NotImplementedError(f"Unknown method: '{method}'")
-clean.to_parquet(outputs[0])
+with traced(snakemake):  # type: ignore
+    threshold = float(params["threshold"])
+    method = wildcards["method"]
+
+    statistics = load_statistics(inputs[1])
+    if method == "drop":
+        clean = read_dropped(inputs[0], statistics, threshold)
+    elif method == "impute":
+        clean = read_imputed(inputs[0], statistics)
+    else:
+        raise NotImplementedError(f"Unknown method: '{method}'")
+    write_parquet(clean, outputs[0], profile=params["profile"])
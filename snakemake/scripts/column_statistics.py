@@ -0,0 +1,7 @@
+from _helpers import extract, traced
+from pipeline_core.statistics import compute_statistics, save_statistics
+
+inputs, outputs, _, _ = extract(snakemake)  # type: ignore
+
+with traced(snakemake):  # type: ignore
+    save_statistics(compute_statistics(inputs[0]), outputs[0])
@@ -1,8 +1,30 @@
+import functools
+
 import pandas
-from _helpers import extract
+from _helpers import extract, traced, write_log
+from pipeline_core.concat import concat_reader
+from pipeline_core.footprint import Footprint, format_report, optimize_reader, optimize_table
+from pipeline_core.parquet import read_parquet, write_batches, write_parquet
+
+inputs, outputs, params, _ = extract(snakemake)  # type: ignore
 
-inputs, outputs, _, _ = extract(snakemake)  # type: ignore
+with traced(snakemake):  # type: ignore
+    memory_limit = int(params["memory_limit_mb"]) * 2**20
+    footprint = Footprint(tolerance=float(params["tolerance"]))
+    report = None
 
-dataframes = [pandas.read_parquet(file) for file in inputs]
-concat = pandas.concat(dataframes).reset_index(drop=True)
-concat.to_parquet(outputs[0])
+    if params["streaming"]:
+        open_reader = functools.partial(concat_reader, inputs, memory_limit=memory_limit)
+        if params["optimize"]:
+            reader, report = optimize_reader(open_reader, footprint)
+        else:
+            reader = open_reader()
+        write_batches(reader, outputs[0], profile=params["profile"])
+    else:
+        dataframes = [read_parquet(file) for file in inputs]
+        concat = pandas.concat(dataframes).reset_index(drop=True)
+        if params["optimize"]:
+            concat, report = optimize_table(concat, footprint)
+        write_parquet(concat, outputs[0], profile=params["profile"])
+    text = format_report(report) if report is not None else "Types not optimized"
+    write_log(snakemake, text)  # type: ignore
@@ -1,7 +1,11 @@
-import pandas
-from _helpers import extract
+from _helpers import extract, traced
+from pipeline_core.excel import read_excel
+from pipeline_core.parquet import write_parquet
 
-inputs, outputs, _, _ = extract(snakemake)  # type: ignore
+inputs, outputs, params, _ = extract(snakemake)  # type: ignore
 
-dataframe = pandas.read_excel(inputs[0])
-dataframe.to_parquet(outputs[0])
+with traced(snakemake):  # type: ignore
+    # A batch of dates, one file at a time.
+    for input_path, output_path in zip(inputs, outputs):
+        table = read_excel(input_path, engine=params["engine"])
+        write_parquet(table, output_path, profile=params["profile"])
@@ -1,14 +1,10 @@
-import pickle
+from _helpers import extract, traced
+from pipeline_core.regression import fit_linear_model, load_moments
 
-import pandas
-from _helpers import extract, fit_linear_model
+inputs, outputs, params, wildcards = extract(snakemake)  # type: ignore
 
-inputs, outputs, _, wildcards = extract(snakemake)  # type: ignore
-method = wildcards["method"]
+with traced(snakemake):  # type: ignore
+    method = wildcards["method"]
 
-data = pandas.read_parquet(inputs[0])
-model, r2_adj = fit_linear_model(
-    X=data.drop(columns=data.columns[0]),
-    y=data.drop(columns=data.columns[1:]),
-)
-outputs[0].write_bytes(pickle.dumps(model))
+    fit = fit_linear_model(load_moments(inputs), method, threshold=params["threshold"])
+    fit.to_model().save(outputs[0])
@@ -0,0 +1,7 @@
+from _helpers import extract, traced
+from pipeline_core.regression import compute_moments
+
+inputs, outputs, _, _ = extract(snakemake)  # type: ignore
+
+with traced(snakemake):  # type: ignore
+    compute_moments(inputs[0]).save(outputs[0])
@@ -0,0 +1,14 @@
+from _helpers import extract, traced
+from pipeline_core.model import LinearModel, predict_parquet
+
+inputs, outputs, params, _ = extract(snakemake)  # type: ignore
+
+with traced(snakemake):  # type: ignore
+    model = LinearModel.load(inputs[0])
+    predict_parquet(
+        model,
+        inputs[1],
+        outputs[0],
+        chunk_rows=int(params["chunk_rows"]),
+        profile=params["profile"],
+    )
@@ -0,0 +1,32 @@
+from _helpers import extract, traced
+from pipeline_core.parquet import write_parquet
+from pipeline_core.regression import load_moments
+from pipeline_core.statistics import load_statistics
+from pipeline_core.sweep import (
+    fit_candidate,
+    read_candidate,
+    save_report,
+    select_winners,
+    sweep,
+    sweep_report,
+)
+
+inputs, outputs, params, _ = extract(snakemake)  # type: ignore
+
+with traced(snakemake):  # type: ignore
+    winners = int(params["winners"])
+    # Inputs are the moments of every date, the data and its statistics, outputs the report,
+    # the clean data and the models of the winners.
+    moments = load_moments(inputs[:-2])
+    thresholds = [float(value) for value in params["thresholds"]]
+    results = sweep(moments, thresholds, feature_sets=params["feature_sets"] or None)
+    # Every declared output is written, or Snakemake would fail the job.
+    selected = select_winners(results, winners)
+    report = sweep_report(results, moments.rows, winners)
+    statistics = load_statistics(inputs[-1])
+    clean_paths, model_paths = outputs[1 : winners + 1], outputs[winners + 1 :]
+    for result, clean_path, model_path in zip(selected, clean_paths, model_paths):
+        clean = read_candidate(inputs[-2], statistics, result.candidate)
+        write_parquet(clean, clean_path, profile=params["profile"])
+        fit_candidate(moments, result.candidate).to_model().save(model_path)
+    save_report(report, outputs[0])